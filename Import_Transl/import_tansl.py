@@ -1,6 +1,15 @@
+import argparse
 import os
 import csv
 import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from reconcile import MAX_DISTANCE, reconcile
+from translation_table import TranslationTable, load_translation_table
+
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_MIN_FILES = 64
 
 def list_games(base_folder):
     return [f for f in os.listdir(base_folder) if os.path.isdir(os.path.join(base_folder, f))]
@@ -14,97 +23,289 @@ def load_translations(csv_path):
                 translations[row[0].strip()] = row[1].strip()
     return translations
 
-def extract_translation_keys(file_path):
+class FileResult(NamedTuple):
+    keys: set
+    replaced: int
+    missing: int
+    missing_keys: list
+    changed: bool
+
+def _backup(file_path):
+    backup_path = file_path + ".bak"
+    if os.path.exists(backup_path):
+        os.remove(backup_path)
+    try:
+        # A hard link keeps the original contents without copying any data;
+        # the rewritten file is then renamed over the original name.
+        os.link(file_path, backup_path)
+    except OSError:
+        shutil.copy2(file_path, backup_path)
+
+def _translation_key(stripped_line):
+    parts = stripped_line.split(" ", 2)
+    return parts[2].strip() if len(parts) > 2 else None
+
+def scan_keys(file_path, language="portuguese"):
+    """Return the translation keys of one .rpy file without changing it."""
+    prefix = f"translate {language}"
     keys = set()
     with open(file_path, "r", encoding="utf-8") as f:
         for line in f:
             stripped_line = line.strip()
-            if stripped_line.startswith("translate portuguese"):
-                parts = stripped_line.split(" ", 2)
-                if len(parts) > 2:
-                    keys.add(parts[2].strip())
+            if stripped_line.startswith(prefix):
+                key = _translation_key(stripped_line)
+                if key is not None:
+                    keys.add(key)
     return keys
 
-def update_translation_files(game_folder, translations):
-    tl_folder = os.path.join(game_folder, "game", "tl", "portuguese")
-    if not os.path.exists(tl_folder):
-        print(f"Translation folder not found: {tl_folder}")
-        return
+def process_file(file_path, translations, language="portuguese"):
+    """Collect the translation keys of one .rpy file and rewrite it in a single pass.
 
-    replaced, added, missing = 0, 0, 0
+    Output goes to a temporary file that atomically replaces the original,
+    and only once the first line actually changes; unchanged files are only
+    read, and get no backup.
+    """
+    prefix = f"translate {language}"
+    keys = set()
+    replaced, missing = 0, 0
     missing_keys = []
-    found_keys = set()
-    
-    for root, _, files in os.walk(tl_folder):
-        for file in files:
-            if file.endswith(".rpy"):
-                file_path = os.path.join(root, file)
-                found_keys.update(extract_translation_keys(file_path))
-                backup_path = file_path + ".bak"
-                shutil.copy(file_path, backup_path)  # Create a backup
-                with open(file_path, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                
-                with open(file_path, "w", encoding="utf-8") as f:
-                    for line in lines:
-                        stripped_line = line.strip()
-                        if stripped_line.startswith("translate portuguese"):
-                            parts = stripped_line.split(" ", 2)
-                            if len(parts) > 2:
-                                key = parts[2].strip()
-                                if key in translations:
-                                    f.write(f'    "{translations[key]}"\n')
-                                    replaced += 1
-                                else:
-                                    missing_keys.append(key)
-                                    f.write(line)
-                                    missing += 1
+    pending = []        # lines read before the first change
+    out = None          # temp file, opened on the first change
+    tmp_path = file_path + ".tmp"
+
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                stripped_line = line.strip()
+                new_line = line
+                if stripped_line.startswith(prefix):
+                    key = _translation_key(stripped_line)
+                    if key is not None:
+                        keys.add(key)
+                        if key in translations:
+                            new_line = f'    "{translations[key]}"\n'
+                            replaced += 1
                         else:
-                            f.write(line)
-    
-    print(f"Translations replaced: {replaced}")
-    print(f"Translations missing: {missing}")
-    
-    print("Keys found in .rpy files but not in CSV:")
-    for key in (found_keys - translations.keys()):
-        print(f" - {key}")
-    
-    print("Keys in CSV but not in .rpy files:")
-    for key in (translations.keys() - found_keys):
-        print(f" - {key}")
-    
+                            missing_keys.append(key)
+                            missing += 1
+                    else:
+                        new_line = ""
+
+                if out is None and new_line != line:
+                    out = open(tmp_path, "w", encoding="utf-8")
+                    out.writelines(pending)
+                    pending = None
+                if out is None:
+                    pending.append(line)
+                else:
+                    out.write(new_line)
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(tmp_path)
+        raise
+
+    if out is not None:
+        out.close()
+        _backup(file_path)
+        os.replace(tmp_path, file_path)
+    return FileResult(keys, replaced, missing, missing_keys, out is not None)
+
+_worker_table = None
+_worker_aliases = {}
+
+def _init_worker(table, aliases=None):
+    # Runs once per worker process, so the table is sent once, not once per file
+    global _worker_table, _worker_aliases
+    _worker_table = table
+    _worker_aliases = aliases or {}
+
+def _process_task(task):
+    file_path, language = task
+    return process_file(file_path, _worker_table.language(language, _worker_aliases.get(language)), language)
+
+def process_files(tasks, table, workers=None, aliases=None):
+    """Run process_file over many (file path, language) tasks, in parallel when worthwhile.
+
+    Results come back in the order of ``tasks`` whether or not a pool is used.
+    ``aliases`` maps a language to its {game key: catalog key} near matches.
+    """
+    if workers == 1 or len(tasks) < PARALLEL_MIN_FILES:
+        _init_worker(table, aliases)
+        return [_process_task(task) for task in tasks]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(table, aliases)) as pool:
+        return list(pool.map(_process_task, tasks, chunksize=chunksize))
+
+def find_near_matches(tasks, table, languages, max_distance=MAX_DISTANCE):
+    """Pair the keys of the tl files missing from the catalog with unused catalog keys, per language."""
+    matches = {}
+    for language in languages:
+        found_keys = set()
+        for file_path, task_language in tasks:
+            if task_language == language:
+                found_keys |= scan_keys(file_path, language)
+        catalog_keys = table.language(language).keys()
+        matches[language] = reconcile(found_keys - catalog_keys, catalog_keys - found_keys, max_distance)
+    return matches
+
+def update_languages(game_folder, table, languages=None, workers=None, fuzzy=None, max_distance=MAX_DISTANCE):
+    """Update the tl folder of every language in ``table`` (or just ``languages``) in one go.
+
+    Keys that differ slightly from an unused catalog key (see reconcile.py)
+    are listed with ``fuzzy="propose"``, and translated from that catalog
+    key with ``fuzzy="apply"``.
+    """
+    languages = languages or table.languages
+    tasks = []
+    for language in languages:
+        tl_folder = os.path.join(game_folder, "game", "tl", language)
+        if not os.path.exists(tl_folder):
+            print(f"Translation folder not found: {tl_folder}")
+            continue
+        tasks.extend(
+            (os.path.join(root, file), language)
+            for root, _, files in os.walk(tl_folder)
+            for file in files
+            if file.endswith(".rpy")
+        )
+    if not tasks:
+        return
+
+    near_matches = {}
+    if fuzzy == "apply":
+        # The files are rewritten in one pass, so the matches must be known before
+        near_matches = find_near_matches(tasks, table, languages, max_distance)
+    aliases = {language: {match.identifier: match.catalog for match in matches}
+               for language, matches in near_matches.items()}
+    results = process_files(tasks, table, workers, aliases)
+
+    # Each file is handled independently; merge the per-file results in walk order
+    for language in languages:
+        language_results = [result for (_, task_language), result in zip(tasks, results) if task_language == language]
+        if not language_results:
+            continue
+        translations = table.language(language)
+
+        replaced, missing, changed = 0, 0, 0
+        missing_keys = []
+        found_keys = set()
+        for result in language_results:
+            found_keys.update(result.keys)
+            replaced += result.replaced
+            missing += result.missing
+            missing_keys.extend(result.missing_keys)
+            changed += result.changed
+
+        if len(languages) > 1:
+            print(f"\n== {language} ==")
+        print(f"Translations replaced: {replaced}")
+        print(f"Translations missing: {missing}")
+        print(f"Files changed (backed up as .bak): {changed}")
+
+        language_aliases = aliases.get(language, {})
+        unknown_keys = found_keys - translations.keys() - language_aliases.keys()
+        unused_keys = translations.keys() - found_keys - set(language_aliases.values())
+        if fuzzy == "propose":
+            matches = reconcile(unknown_keys, unused_keys, max_distance)
+        else:
+            matches = near_matches.get(language, [])
+        if fuzzy:
+            verb = "applied" if fuzzy == "apply" else "proposed"
+            print(f"Near matches {verb} (game key <- CSV key): {len(matches)}")
+            for match in matches:
+                print(f" - {match.identifier} <- {match.catalog} (distance {match.distance})")
+
+        print("Keys found in .rpy files but not in CSV:")
+        for key in sorted(unknown_keys):
+            print(f" - {key}")
+
+        print("Keys in CSV but not in .rpy files:")
+        for key in sorted(unused_keys):
+            print(f" - {key}")
+
     print("Update complete!")
 
+def update_translation_files(game_folder, translations, workers=None, language="portuguese", fuzzy=None):
+    """Update a single language from an identifier -> translation mapping."""
+    if not isinstance(translations, TranslationTable):
+        translations = TranslationTable.from_mapping(translations, language)
+    update_languages(game_folder, translations, [language], workers, fuzzy)
+
 def main():
+    parser = argparse.ArgumentParser(description="Import translations from a CSV/TSV catalog into a game's tl folders")
+    parser.add_argument("--csv", dest="csv_path", help="Translation catalog (default: Tools/Import_Transl/dialogue.csv)")
+    parser.add_argument("--game", help="Game folder (default: choose from the Test folder)")
+    parser.add_argument(
+        "--language",
+        action="append",
+        dest="languages",
+        help=(
+            "tl folder to update; may be repeated. Defaults to every language column of a "
+            "multi-language catalog, or 'portuguese' for a single-language one"
+        ),
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument(
+        "--fuzzy",
+        choices=("propose", "apply"),
+        help=(
+            "Match keys that differ slightly from an unused catalog key (e.g. 36Xb1b83 vs 360b1b83): "
+            "'propose' lists the pairs, 'apply' also imports their translations"
+        ),
+    )
+    parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=MAX_DISTANCE,
+        help=f"Largest number of edited characters for --fuzzy (default: {MAX_DISTANCE})",
+    )
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args()
+
     base_folder = r"D:\Windows-Dateienordner\Dokumente\DAZ 3D\Novel\Test"
-    csv_path = os.path.join(base_folder, "Tools", "Import_Transl", "dialogue.csv")
+    csv_path = args.csv_path or os.path.join(base_folder, "Tools", "Import_Transl", "dialogue.csv")
     
     if not os.path.exists(csv_path):
         print("Translation file not found!")
         return
 
-    games = list_games(base_folder)
-    if not games:
-        print("No games found in Test folder.")
-        return
-    
-    print("Available games:")
-    for idx, game in enumerate(games, 1):
-        print(f"{idx}. {game}")
-    
-    choice = int(input("Select a game by number: ")) - 1
-    if choice < 0 or choice >= len(games):
-        print("Invalid choice.")
-        return
-    
-    game_folder = os.path.join(base_folder, games[choice])
-    confirm = input(f"Are you sure you want to update translations for {games[choice]}? (yes/no): ")
-    if confirm.lower() != "yes":
-        print("Operation canceled.")
+    if args.game:
+        game_folder = args.game
+    else:
+        games = list_games(base_folder)
+        if not games:
+            print("No games found in Test folder.")
+            return
+
+        print("Available games:")
+        for idx, game in enumerate(games, 1):
+            print(f"{idx}. {game}")
+
+        choice = int(input("Select a game by number: ")) - 1
+        if choice < 0 or choice >= len(games):
+            print("Invalid choice.")
+            return
+        game_folder = os.path.join(base_folder, games[choice])
+
+    # One parse of the catalog serves every language
+    table = load_translation_table(csv_path, (args.languages or ["portuguese"])[0])
+    languages = args.languages or table.languages
+    unknown = [language for language in languages if language not in table.languages]
+    if unknown:
+        print(f"Languages not in the catalog: {', '.join(unknown)}. Catalog languages: {', '.join(table.languages)}")
         return
+
+    if not args.yes:
+        confirm = input(
+            f"Are you sure you want to update {', '.join(languages)} translations for {os.path.basename(game_folder)}? (yes/no): "
+        )
+        if confirm.lower() != "yes":
+            print("Operation canceled.")
+            return
     
-    translations = load_translations(csv_path)
-    update_translation_files(game_folder, translations)
+    update_languages(game_folder, table, languages, args.workers, args.fuzzy, args.max_distance)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,175 @@
+"""Fuzzy matching of drifted translation identifiers.
+
+Ren'Py identifiers are a label followed by an 8-character hash of the line
+(``b_alley_rescue_360b1b83``), with ``_1``, ``_2``... appended to repeats.
+Catalogs that went through a spreadsheet or a translator's tooling come
+back with some of them damaged (``b_alley_rescue_36Xb1b83``), and those
+lines are then reported missing although their translation is there.
+
+``reconcile`` pairs the game identifiers the catalog lacks with catalog
+identifiers no game line uses, when they are within a small edit distance
+(compared case-insensitively). Candidates come from the same label first,
+and otherwise from a character trigram index filtered with the q-gram
+bound, so only a handful of pairs is compared even with 100k keys. A pair
+is only kept when it is unambiguous: its catalog identifier is strictly
+the closest to the game identifier, and no other game identifier is as
+close to it.
+"""
+
+import re
+from collections import Counter
+from typing import Iterable, NamedTuple
+
+MAX_DISTANCE = 2
+_Q = 3
+# Trigrams shared by more identifiers than this are skipped when counting
+# candidates; the q-gram bound is lowered by one for each skipped trigram.
+_MAX_POSTING = 2000
+
+_IDENTIFIER = re.compile(r"^(.*)_([^_]{8}(?:_\d+)?)$")
+
+
+class Match(NamedTuple):
+    identifier: str     # as used by the game
+    catalog: str        # as written in the catalog
+    distance: int
+
+
+def split_identifier(identifier: str) -> tuple[str, str]:
+    """Return ``(label, hash)`` of an identifier, or ``("", identifier)`` for other names."""
+    match = _IDENTIFIER.match(identifier)
+    if match is None:
+        return "", identifier
+    return match.group(1), match.group(2)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance of ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``.
+
+    Only the diagonal band of width ``limit`` is computed, so this costs
+    O(len * limit) rather than O(len * len).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(low, high + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != b[j - 1]))
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"\0{text}\0"
+    return {padded[i:i + _Q] for i in range(len(padded) - _Q + 1)}
+
+
+class _GramIndex:
+    """Trigram postings of a group of strings, for the q-gram candidate filter."""
+
+    def __init__(self):
+        self.members: list[int] = []
+        self._postings: dict[str, list[int]] = {}
+
+    def add(self, i: int, text: str):
+        self.members.append(i)
+        for gram in _trigrams(text):
+            self._postings.setdefault(gram, []).append(i)
+
+    def candidates(self, text: str, max_distance: int) -> list[int] | None:
+        """Members that may be within ``max_distance`` of ``text``, or None if the filter can't tell."""
+        grams = _trigrams(text)
+        # An edit changes at most _Q trigrams, so a match shares at least this many.
+        needed = len(grams) - _Q * max_distance
+        counts: Counter = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram, ())
+            if len(posting) > _MAX_POSTING:
+                needed -= 1
+                continue
+            counts.update(posting)
+        if needed <= 0:
+            return None
+        return [i for i, shared in counts.items() if shared >= needed]
+
+
+class IdentifierIndex:
+    """Catalog identifiers grouped by label, with trigram postings per label and overall.
+
+    Within a label only the hashes need comparing; the overall postings
+    catch identifiers whose label itself drifted.
+    """
+
+    def __init__(self, identifiers: Iterable[str]):
+        self.identifiers = list(identifiers)
+        self._folded = [identifier.lower() for identifier in self.identifiers]
+        self._tails: list[str] = []
+        self._by_label: dict[str, _GramIndex] = {}
+        self._all = _GramIndex()
+        for i, folded in enumerate(self._folded):
+            label, tail = split_identifier(folded)
+            self._tails.append(tail)
+            if label:
+                self._by_label.setdefault(label, _GramIndex()).add(i, tail)
+            self._all.add(i, folded)
+
+    def closest(self, identifier: str, max_distance: int = MAX_DISTANCE) -> list[tuple[int, int]]:
+        """Return ``(distance, catalog index)`` of the candidates within ``max_distance``, closest first."""
+        folded = identifier.lower()
+        label, tail = split_identifier(folded)
+        found = []
+        group = self._by_label.get(label) if label else None
+        if group is not None:
+            candidates = group.candidates(tail, max_distance)
+            for i in group.members if candidates is None else candidates:
+                distance = edit_distance(tail, self._tails[i], max_distance)
+                if distance <= max_distance:
+                    found.append((distance, i))
+        if not found:
+            # Too short or too common to narrow down: only the label group is tried
+            for i in self._all.candidates(folded, max_distance) or ():
+                distance = edit_distance(folded, self._folded[i], max_distance)
+                if distance <= max_distance:
+                    found.append((distance, i))
+        found.sort()
+        return found
+
+
+def reconcile(missing: Iterable[str], unused: Iterable[str], max_distance: int = MAX_DISTANCE) -> list[Match]:
+    """Pair game identifiers missing from the catalog with unused catalog identifiers.
+
+    Ambiguous pairs are dropped rather than guessed: a game identifier with
+    two equally close candidates, or a catalog identifier claimed by two
+    game identifiers at its best distance, yields no match.
+    """
+    index = IdentifierIndex(sorted(unused))
+    best: dict[int, list[tuple[int, str]]] = {}
+    for identifier in sorted(missing):
+        found = index.closest(identifier, max_distance)
+        if not found or (len(found) > 1 and found[1][0] == found[0][0]):
+            continue
+        distance, i = found[0]
+        best.setdefault(i, []).append((distance, identifier))
+
+    matches = []
+    for i, claims in best.items():
+        claims.sort()
+        if len(claims) > 1 and claims[1][0] == claims[0][0]:
+            continue
+        distance, identifier = claims[0]
+        matches.append(Match(identifier, index.identifiers[i], distance))
+    matches.sort()
+    return matches
@@ -0,0 +1,113 @@
+"""Compact identifier -> translation lookup for multi-language catalogs.
+
+A catalog is a CSV/TSV file with an Identifier column and one column per
+language, named like the game's tl folder (portuguese, german, ...).
+Identifiers are stored once, sorted, in a single list searched with
+bisect, and each language is a tuple aligned with it. All strings are
+interned, so lines that repeat thousands of times ("...", "Yes.") are
+stored once. The catalog is parsed once, however many languages it holds.
+"""
+
+import csv
+import os
+import sys
+from bisect import bisect_left
+from typing import Iterable, Mapping
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogue_export import DIALOGUE_COLUMNS
+from dialogue_store import iter_rows, read_header
+
+IDENTIFIER_COLUMN = "Identifier"
+
+
+class TranslationTable:
+    def __init__(self, rows: Iterable[tuple[str, list[str]]], languages: list[str]):
+        intern = sys.intern
+        entries: dict[str, list[str]] = {}
+        for identifier, values in rows:
+            identifier = identifier.strip()
+            if identifier:
+                # Later rows win, like they did with a plain dict
+                entries[intern(identifier)] = values
+
+        self.languages = list(languages)
+        self.identifiers = sorted(entries)
+        self._columns = [
+            tuple(intern(entries[identifier][column].strip()) for identifier in self.identifiers)
+            for column in range(len(self.languages))
+        ]
+
+    @classmethod
+    def from_mapping(cls, translations: Mapping[str, str], language: str) -> "TranslationTable":
+        return cls(((key, [value]) for key, value in translations.items()), [language])
+
+    def row(self, identifier: str) -> int:
+        """Return the row of ``identifier``, or -1 if the catalog doesn't have it."""
+        i = bisect_left(self.identifiers, identifier)
+        if i < len(self.identifiers) and self.identifiers[i] == identifier:
+            return i
+        return -1
+
+    def language(self, language: str, aliases: Mapping[str, str] | None = None) -> "LanguageView":
+        return LanguageView(self, self._columns[self.languages.index(language)], aliases)
+
+
+class LanguageView:
+    """Read-only mapping of identifier -> translation for one language.
+
+    Identifiers whose cell is empty for this language count as absent.
+    ``aliases`` maps game identifiers to the catalog identifier to look up
+    instead (see reconcile.py); ``keys()`` still lists catalog identifiers.
+    """
+
+    __slots__ = ("_table", "_column", "_aliases")
+
+    def __init__(self, table: TranslationTable, column: tuple, aliases: Mapping[str, str] | None = None):
+        self._table = table
+        self._column = column
+        self._aliases = aliases or {}
+
+    def get(self, identifier: str, default=None):
+        identifier = self._aliases.get(identifier, identifier)
+        row = self._table.row(identifier)
+        if row < 0 or not self._column[row]:
+            return default
+        return self._column[row]
+
+    def __contains__(self, identifier: str) -> bool:
+        return self.get(identifier) is not None
+
+    def __getitem__(self, identifier: str) -> str:
+        value = self.get(identifier)
+        if value is None:
+            raise KeyError(identifier)
+        return value
+
+    def keys(self) -> set[str]:
+        return {identifier for identifier, value in zip(self._table.identifiers, self._column) if value}
+
+
+def load_translation_table(path: str, default_language: str = "portuguese") -> TranslationTable:
+    """Load a translation catalog in any of the supported layouts.
+
+    - Multi-language: an Identifier column plus one column per language.
+    - A translated dialogue export (dialogue.csv / dialogue.tab): the
+      Dialogue column, for ``default_language``.
+    - Legacy headerless two-column CSV (identifier, translation), for
+      ``default_language``.
+    """
+    headers = read_header(path)
+    if IDENTIFIER_COLUMN not in headers:
+        with open(path, newline="", encoding="utf-8") as csvfile:
+            rows = ((row[0], [row[1]]) for row in csv.reader(csvfile) if len(row) >= 2)
+            return TranslationTable(rows, [default_language])
+
+    languages = [column for column in headers if column and column not in DIALOGUE_COLUMNS]
+    if not languages:
+        rows = iter_rows(path, (IDENTIFIER_COLUMN, "Dialogue"))
+        return TranslationTable(((identifier, [text]) for identifier, text in rows), [default_language])
+
+    rows = iter_rows(path, [IDENTIFIER_COLUMN] + languages)
+    return TranslationTable(((row[0], row[1:]) for row in rows), languages)
@@ -1,10 +1,36 @@
-import pandas as pd
-import requests
+import argparse
 import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dialogue_export import write_rows
+from dialogue_store import iter_rows, read_header
+from language_cache import LanguageCache, text_key
 
-# Load the data
-file_path = 'D:/Windows-Dateienordner/Dokumente/DAZ 3D/Novel/Test/Tools/Language Detection/dialogue.tab'
-df = pd.read_csv(file_path, sep='\t')
+try:
+    # Optional: offline engine (needs NumPy). Without it only the DeepL engine is available.
+    from ngram_detector import NgramDetector, save_profiles, train_profiles
+except ImportError:
+    NgramDetector = None
+
+# Default input/output files
+INPUT_PATH = 'D:/Windows-Dateienordner/Dokumente/DAZ 3D/Novel/Test/Tools/Language Detection/dialogue.tab'
+OUTPUT_PATH = 'D:/Windows-Dateienordner/Dokumente/DAZ 3D/Novel/Test/Tools/Language Detection/dialogue_with_language.tab'
+
+# Detected languages are cached by text hash, so re-runs only detect new or edited lines
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'language_cache.sqlite')
+
+# n-gram profiles of the offline engine (rebuild with --train)
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'language_profiles.json')
+CONFIDENCE_THRESHOLD = 0.9  # Offline results below this are sent to DeepL
 
 # DeepL API key
 # Do NOT hardcode API keys in this repository.
@@ -12,41 +38,312 @@ df = pd.read_csv(file_path, sep='\t')
 #   $Env:DEEPL_API_KEY = "..."
 DEEPL_API_KEY = os.getenv("DEEPL_API_KEY", "")
 
+# Endpoint can be overridden, e.g. to point at a local stub server for testing.
+DEEPL_API_URL = os.getenv("DEEPL_API_URL", "https://api.deepl.com/v2/translate")
+
+BATCH_SIZE = 50         # DeepL accepts up to 50 "text" params per request
+MAX_WORKERS = 4         # Concurrent requests in flight
+MAX_RETRIES = 6         # Per batch, for 429/5xx/connection errors
+BACKOFF_BASE = 1.0      # Seconds; doubled on every retry
+BACKOFF_MAX = 60.0
+
 DEBUG = False
 
-# Function to detect language using DeepL API
-def detect_language(text):
-    if not DEEPL_API_KEY:
+# Status codes worth retrying: rate limited, and transient server errors.
+_RETRY_STATUS = {429, 500, 502, 503, 504, 529}
+
+
+class _RateLimitGate:
+    """Shared pause for all workers once the API signals rate limiting."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def wait(self):
+        with self._lock:
+            delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def make_session(pool_size=MAX_WORKERS):
+    """Return a requests session that keeps connections to the API alive."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _retry_delay(response, attempt):
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+    return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) * (0.5 + random.random() / 2)
+
+
+def detect_languages_batch(session, texts, url=None, api_key=None, gate=None):
+    """Detect the language of several texts with a single API request.
+
+    Returns one language code per text ('unknown' or 'error' on failure).
+    """
+    api_key = api_key or DEEPL_API_KEY
+    if not api_key:
         raise RuntimeError("DEEPL_API_KEY is not set. Configure it as an environment variable and re-run.")
-    url = "https://api.deepl.com/v2/translate"  # Correct endpoint
-    params = {
-        "auth_key": DEEPL_API_KEY,
-        "text": text,
-        "target_lang": "EN"  # Target language doesn't matter for detection
-    }
-    response = requests.post(url, data=params)
-    
-    # Log the response for debugging
-    if DEBUG:
+    params = [
+        ("auth_key", api_key),
+        ("target_lang", "EN"),  # Target language doesn't matter for detection
+    ] + [("text", text) for text in texts]
+
+    response = None
+    for attempt in range(MAX_RETRIES + 1):
+        if gate is not None:
+            gate.wait()
         try:
-            print(f"Response: {response.json()}")
-        except Exception:
-            print("Response: <non-json>")
-    
-    if response.status_code == 200:
-        result = response.json()
-        if 'translations' in result and result['translations']:
-            return result['translations'][0].get('detected_source_language', 'unknown')
-        else:
-            return 'unknown'
-    else:
-        return 'error'
-
-# Apply language detection to the "Dialogue" column
-df['Language'] = df['Dialogue'].apply(detect_language)
-
-# Save the updated dataframe to a new file
-output_path = 'D:/Windows-Dateienordner/Dokumente/DAZ 3D/Novel/Test/Tools/Language Detection/dialogue_with_language.tab'
-df.to_csv(output_path, sep='\t', index=False)
-
-print("Language detection completed and saved to:", output_path)
+            response = session.post(url or DEEPL_API_URL, data=params, timeout=60)
+        except requests.RequestException as e:
+            if DEBUG:
+                print(f"Request failed: {e}")
+            response = None
+            if attempt < MAX_RETRIES:
+                time.sleep(_retry_delay(None, attempt))
+            continue
+
+        # Log the response for debugging
+        if DEBUG:
+            try:
+                print(f"Response: {response.json()}")
+            except Exception:
+                print("Response: <non-json>")
+
+        if response.status_code not in _RETRY_STATUS:
+            break
+        if attempt < MAX_RETRIES:
+            delay = _retry_delay(response, attempt)
+            if response.status_code == 429 and gate is not None:
+                gate.pause(delay)
+            else:
+                time.sleep(delay)
+
+    if response is None or response.status_code != 200:
+        return ['error'] * len(texts)
+
+    translations = response.json().get('translations') or []
+    languages = [t.get('detected_source_language', 'unknown') for t in translations]
+    return (languages + ['unknown'] * len(texts))[:len(texts)]
+
+
+def detect_languages(texts, session=None, url=None, api_key=None, batch_size=BATCH_SIZE, workers=MAX_WORKERS):
+    """Detect the language of every text, batching requests and running them concurrently.
+
+    Results are returned in input order. Blank texts are not sent.
+    """
+    texts = list(texts)
+    results = ['unknown'] * len(texts)
+    pending = [i for i, text in enumerate(texts) if text and text.strip()]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    if not batches:
+        return results
+
+    own_session = session is None
+    session = session or make_session(workers)
+    gate = _RateLimitGate()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(detect_languages_batch, session, [texts[i] for i in batch], url, api_key, gate)
+                for batch in batches
+            ]
+            for batch, future in zip(batches, futures):
+                for i, language in zip(batch, future.result()):
+                    results[i] = language
+    finally:
+        if own_session:
+            session.close()
+    return results
+
+
+def detect_language(text):
+    """Detect the language of a single text using the DeepL API."""
+    return detect_languages([text])[0]
+
+
+def detect_languages_cached(texts, cache, stats=None, **kwargs):
+    """Detect languages, sending each distinct (normalized) text at most once.
+
+    Texts already in ``cache`` are not sent at all; new results are stored
+    in it. ``stats``, if given, counts 'cached' and 'detected' texts.
+    """
+    keys = [text_key(text) for text in texts]
+    known = cache.get_many(set(keys), 'deepl')
+
+    # Deduplicate before any call goes out
+    todo = {}
+    for key, text in zip(keys, texts):
+        if key not in known and key not in todo:
+            todo[key] = text
+
+    if todo:
+        detected = dict(zip(todo, detect_languages(list(todo.values()), **kwargs)))
+        cache.put_many({key: language for key, language in detected.items() if language != 'error'}, 'deepl')
+        known.update(detected)
+
+    if stats is not None:
+        stats['detected'] = stats.get('detected', 0) + len(todo)
+        stats['cached'] = stats.get('cached', 0) + len(texts) - len(todo)
+    return [known[key] for key in keys]
+
+
+class RemoteDetector:
+    """DeepL engine: cached, deduplicated, batched and concurrent."""
+
+    name = 'deepl'
+
+    def __init__(self, session, cache, url=None, batch_size=BATCH_SIZE, workers=MAX_WORKERS, stats=None):
+        self.session = session
+        self.cache = cache
+        self.url = url
+        self.batch_size = batch_size
+        self.workers = workers
+        self.stats = stats
+
+    def detect(self, texts):
+        return detect_languages_cached(
+            texts, self.cache, self.stats,
+            session=self.session, url=self.url, batch_size=self.batch_size, workers=self.workers,
+        )
+
+
+class FallbackDetector:
+    """Offline engine first; only lines it is unsure about go to the remote engine."""
+
+    name = 'local'
+
+    def __init__(self, local, remote=None, threshold=CONFIDENCE_THRESHOLD, stats=None):
+        self.local = local
+        self.remote = remote
+        self.threshold = threshold
+        self.stats = stats
+
+    def detect(self, texts):
+        languages, confidence = self.local.predict(texts)
+        unsure = [i for i, value in enumerate(confidence) if value < self.threshold]
+        if self.stats is not None:
+            self.stats['local'] = self.stats.get('local', 0) + len(texts) - len(unsure)
+            self.stats['unsure'] = self.stats.get('unsure', 0) + len(unsure)
+        if unsure and self.remote is not None:
+            for i, language in zip(unsure, self.remote.detect([texts[i] for i in unsure])):
+                languages[i] = language
+        return languages
+
+
+def rows_with_language(file_path, detector, chunk_size=BATCH_SIZE * MAX_WORKERS * 4):
+    """Yield the rows of a dialogue export with a detected Language column appended.
+
+    Rows are processed in chunks so memory stays flat on large exports.
+    """
+    dialogue_index = read_header(file_path).index('Dialogue')
+    rows = iter_rows(file_path)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        languages = detector.detect([row[dialogue_index] for row in chunk])
+        for row, language in zip(chunk, languages):
+            yield row + [language]
+
+
+def train(sources, profile_path):
+    """Build the offline engine's profiles from already-labelled exports.
+
+    Each source is either an export with a Language column (e.g. a previous
+    dialogue_with_language.tab) or ``PATH=LANG`` to label every line of an
+    export (e.g. a translated dialogue.csv) with one language.
+    """
+    def samples():
+        for source in sources:
+            path, _, language = source.partition('=')
+            if language:
+                for (text,) in iter_rows(path, ('Dialogue',)):
+                    yield text, language.upper()
+            else:
+                for text, detected in iter_rows(path, ('Dialogue', 'Language')):
+                    if detected not in ('unknown', 'error'):
+                        yield text, detected
+
+    profiles = train_profiles(samples())
+    save_profiles(profiles, profile_path)
+    for language, profile in profiles['languages'].items():
+        print(f"  {language}: {profile['lines']} lines")
+    print("Language profiles saved to:", profile_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect the language of every line of a dialogue.tab export")
+    parser.add_argument("input", nargs="?", default=INPUT_PATH, help="Path to dialogue.tab")
+    parser.add_argument("output", nargs="?", default=OUTPUT_PATH, help="Path of the output .tab file")
+    parser.add_argument(
+        "--engine",
+        choices=("auto", "local", "deepl"),
+        default="auto",
+        help=(
+            "local: offline n-gram engine only; deepl: DeepL API only; "
+            "auto (default): offline engine, with DeepL for low-confidence lines if DEEPL_API_KEY is set"
+        ),
+    )
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD, help="Offline confidence needed to skip DeepL (default: %(default)s)")
+    parser.add_argument("--profiles", default=PROFILE_PATH, help="Offline engine profiles (default: %(default)s)")
+    parser.add_argument("--train", nargs="+", metavar="SOURCE", help="Rebuild the offline profiles from labelled exports (PATH or PATH=LANG) and exit")
+    parser.add_argument("--url", default=DEEPL_API_URL, help="DeepL translate endpoint (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Texts per request (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent requests (default: %(default)s)")
+    parser.add_argument("--cache", default=CACHE_PATH, help="SQLite cache of detected languages (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the cache and detect every line again")
+    args = parser.parse_args()
+
+    if (args.train or args.engine == "local") and NgramDetector is None:
+        raise RuntimeError("The offline engine needs NumPy. Install it with: pip install numpy")
+    if args.train:
+        train(args.train, args.profiles)
+        return
+
+    local = None
+    if args.engine != "deepl" and NgramDetector is not None and os.path.exists(args.profiles):
+        local = NgramDetector.load(args.profiles)
+    if args.engine == "local" and local is None:
+        raise RuntimeError(f"No language profiles found at {args.profiles}. Build them with --train.")
+    use_remote = args.engine == "deepl" or (args.engine == "auto" and (DEEPL_API_KEY or local is None))
+    if use_remote and not DEEPL_API_KEY:
+        raise RuntimeError("DEEPL_API_KEY is not set. Configure it as an environment variable and re-run.")
+
+    headers = read_header(args.input)
+    stats = {}
+    # Even without the persistent cache, identical lines are only detected once per run
+    with LanguageCache(':memory:' if args.no_cache else args.cache) as cache, make_session(args.workers) as session:
+        remote = RemoteDetector(session, cache, args.url, args.batch_size, args.workers, stats) if use_remote else None
+        detector = FallbackDetector(local, remote, args.threshold, stats) if local is not None else remote
+
+        # Apply language detection to the "Dialogue" column and save the updated rows to a new file
+        rows = rows_with_language(args.input, detector, args.batch_size * args.workers * 4)
+        write_rows(args.output, headers + ['Language'], rows)
+
+    if local is not None:
+        print(f"Lines detected offline: {stats.get('local', 0)}, low confidence: {stats.get('unsure', 0)}")
+        if remote is None and stats.get('unsure'):
+            print("  Low-confidence lines keep the offline guess; set DEEPL_API_KEY to verify them with DeepL.")
+    if remote is not None:
+        print(f"Distinct texts sent for detection: {stats.get('detected', 0)}, lines taken from cache or duplicates: {stats.get('cached', 0)}")
+    print("Language detection completed and saved to:", args.output)
+
+
+if __name__ == "__main__":
+    main()
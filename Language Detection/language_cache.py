@@ -0,0 +1,76 @@
+"""Persistent cache of detected languages, keyed by a hash of the dialogue text.
+
+Between builds only a few percent of the lines of an export change, and
+short lines such as "..." or "Yes." repeat thousands of times, so each
+distinct text only needs to be detected once. Texts are normalized
+(Unicode NFC, whitespace collapsed) before hashing so that re-exports with
+different spacing still hit the cache.
+"""
+
+import hashlib
+import sqlite3
+import unicodedata
+from typing import Iterable
+
+# SQLite's default limit on host parameters is 999.
+_LOOKUP_CHUNK = 900
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+
+class LanguageCache:
+    """SQLite-backed mapping of (engine, text hash) to a language code.
+
+    Use ``":memory:"`` as the path for a cache that only deduplicates
+    within the current run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS detections ("
+            " engine TEXT NOT NULL,"
+            " hash BLOB NOT NULL,"
+            " language TEXT NOT NULL,"
+            " PRIMARY KEY (engine, hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[bytes], engine: str) -> dict[bytes, str]:
+        keys = list(keys)
+        found: dict[bytes, str] = {}
+        for start in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = self._conn.execute(
+                f"SELECT hash, language FROM detections WHERE engine = ? AND hash IN ({placeholders})",
+                [engine, *chunk],
+            )
+            found.update(cursor.fetchall())
+        return found
+
+    def put_many(self, items: dict[bytes, str], engine: str) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO detections (engine, hash, language) VALUES (?, ?, ?)",
+            [(engine, key, language) for key, language in items.items()],
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
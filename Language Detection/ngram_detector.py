@@ -0,0 +1,160 @@
+"""Offline language detection with character n-gram profiles.
+
+A profile holds the most frequent character 1- to 3-grams of a language,
+learned from lines whose language is already known (for example the
+Language column written by a DeepL run). Scoring is done for a whole
+column at once: the n-grams of all texts are mapped to vocabulary ids and
+the per-language log-likelihoods are summed with ``np.bincount``, so the
+only per-text Python work is the n-gram extraction.
+
+Each prediction comes with a confidence in [0, 1]; callers fall back to a
+remote detector for lines below their threshold.
+"""
+
+import json
+import re
+from collections import Counter
+from typing import Iterable
+
+import numpy as np
+
+PROFILE_VERSION = 1
+NGRAM_SIZES = (1, 2, 3)
+PROFILE_SIZE = 3000     # n-grams kept per language
+MIN_SAMPLES = 50        # lines needed before a language gets a profile
+MIN_LETTERS = 4         # shorter texts are never scored confidently
+
+# Ren'Py text tags ({i}, {/b}) and interpolations ([name]) are not language.
+_MARKUP = re.compile(r"\{[^}]*\}|\[[^\]]*\]")
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+
+
+def _clean(text: str) -> str:
+    words = _NON_LETTERS.sub(" ", _MARKUP.sub(" ", text).lower()).split()
+    return " " + " ".join(words) + " " if words else ""
+
+
+def _ngrams(cleaned: str) -> list[str]:
+    grams = []
+    for n in NGRAM_SIZES:
+        for i in range(len(cleaned) - n + 1):
+            gram = cleaned[i:i + n]
+            if gram.strip():
+                grams.append(gram)
+    return grams
+
+
+def train_profiles(samples: Iterable[tuple[str, str]]) -> dict:
+    """Build profiles from ``(text, language)`` pairs.
+
+    Languages with fewer than ``MIN_SAMPLES`` lines are left out; their
+    lines are better served by the remote detector.
+    """
+    counters: dict[str, Counter] = {}
+    lines: Counter = Counter()
+    for text, language in samples:
+        cleaned = _clean(text)
+        if not cleaned or not language:
+            continue
+        counters.setdefault(language, Counter()).update(_ngrams(cleaned))
+        lines[language] += 1
+
+    languages = {}
+    for language, counter in sorted(counters.items()):
+        if lines[language] < MIN_SAMPLES:
+            continue
+        languages[language] = {
+            "lines": lines[language],
+            "total": sum(counter.values()),
+            "grams": dict(counter.most_common(PROFILE_SIZE)),
+        }
+    return {"version": PROFILE_VERSION, "ngram_sizes": list(NGRAM_SIZES), "languages": languages}
+
+
+def save_profiles(profiles: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+class NgramDetector:
+    """Scores texts against a set of n-gram profiles."""
+
+    name = "local"
+
+    def __init__(self, profiles: dict):
+        if profiles.get("version") != PROFILE_VERSION or list(profiles.get("ngram_sizes", ())) != list(NGRAM_SIZES):
+            raise ValueError("Unsupported language profile format; re-run training.")
+        self.languages = sorted(profiles["languages"])
+        if not self.languages:
+            raise ValueError("The language profile file contains no languages.")
+
+        vocab: dict[str, int] = {}
+        for language in self.languages:
+            for gram in profiles["languages"][language]["grams"]:
+                vocab.setdefault(gram, len(vocab))
+        self._vocab = vocab
+
+        # Row len(vocab) is shared by all n-grams outside the vocabulary.
+        counts = np.zeros((len(vocab) + 1, len(self.languages)), dtype=np.float64)
+        for column, language in enumerate(self.languages):
+            for gram, count in profiles["languages"][language]["grams"].items():
+                counts[vocab[gram], column] = count
+        totals = np.array([profiles["languages"][language]["total"] for language in self.languages], dtype=np.float64)
+        # Add-one smoothing over the joint vocabulary.
+        self._log_probs = np.log((counts + 1.0) / (totals + len(vocab) + 1.0)).astype(np.float32)
+        self._known = counts > 0
+
+    @classmethod
+    def load(cls, path: str) -> "NgramDetector":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def predict(self, texts: list[str]) -> tuple[list[str], np.ndarray]:
+        """Return the best language and its confidence for every text."""
+        n = len(texts)
+        oov = len(self._vocab)
+        vocab_get = self._vocab.get
+
+        ids: list[int] = []
+        lengths = np.zeros(n, dtype=np.int64)
+        trigrams = np.zeros(n, dtype=np.int64)
+        letters = np.zeros(n, dtype=np.int64)
+        for row, text in enumerate(texts):
+            cleaned = _clean(text)
+            grams = _ngrams(cleaned)
+            ids.extend(vocab_get(gram, oov) for gram in grams)
+            lengths[row] = len(grams)
+            # _ngrams emits the trigrams last, one per position.
+            trigrams[row] = max(len(cleaned) - 2, 0)
+            letters[row] = len(cleaned.replace(" ", ""))
+
+        gram_ids = np.array(ids, dtype=np.int64)
+        owners = np.repeat(np.arange(n), lengths)
+        weights = self._log_probs[gram_ids]
+
+        scores = np.empty((n, len(self.languages)), dtype=np.float64)
+        for column in range(len(self.languages)):
+            scores[:, column] = np.bincount(owners, weights=weights[:, column], minlength=n)
+
+        # Per-n-gram log-likelihoods give a length-independent posterior.
+        per_gram = scores / np.maximum(lengths, 1)[:, None]
+        best = per_gram.argmax(axis=1)
+        shifted = np.exp((per_gram - per_gram.max(axis=1, keepdims=True)) * np.sqrt(np.maximum(lengths, 1))[:, None])
+        posterior = shifted[np.arange(n), best] / shifted.sum(axis=1)
+
+        # Text in a language we have no profile for still picks one of ours, but
+        # far fewer of its trigrams appear in that profile. Trigram coverage of
+        # the winning profile is >= 0.9 for almost all lines of a known language.
+        starts = np.cumsum(lengths) - lengths
+        position = np.arange(len(gram_ids)) - starts[owners]
+        is_trigram = position >= (lengths - trigrams)[owners]
+        known = self._known[gram_ids, best[owners]] & is_trigram
+        coverage = np.bincount(owners, weights=known, minlength=n) / np.maximum(trigrams, 1)
+
+        confidence = posterior * np.clip((coverage - 0.8) / 0.15, 0.0, 1.0)
+        confidence[letters < MIN_LETTERS] = 0.0
+        languages = [self.languages[i] if letters[row] else "unknown" for row, i in enumerate(best)]
+        return languages, confidence
+
+    def detect(self, texts: list[str]) -> list[str]:
+        return self.predict(texts)[0]
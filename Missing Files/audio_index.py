@@ -0,0 +1,146 @@
+"""Parallel, cached index of an audio voice tree.
+
+The tree is listed with ``os.scandir`` on a thread pool (one task per
+directory), which keeps many directory listings in flight on slow network
+shares. The listing of every directory is saved to disk together with the
+directory's mtime; on the next run a directory whose mtime is unchanged is
+not listed again, only ``stat``-ed.
+
+Adding or removing a file changes the mtime of the directory that holds it
+(not of its parents), so per-directory mtimes are enough to detect changes.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Iterable
+
+CACHE_VERSION = 1
+
+# Directories modified this close to the scan may change again within the
+# same mtime tick; they are never trusted from the cache.
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+class DirEntry:
+    __slots__ = ("mtime_ns", "files", "subdirs")
+
+    def __init__(self, mtime_ns: int | None, files: list[str], subdirs: list[str]):
+        self.mtime_ns = mtime_ns
+        self.files = files
+        self.subdirs = subdirs
+
+
+def _scan_dir(path: str, cached: DirEntry | None, racy_after_ns: int) -> DirEntry:
+    mtime_ns = os.stat(path).st_mtime_ns
+    if cached is not None and cached.mtime_ns == mtime_ns:
+        return cached
+
+    files: list[str] = []
+    subdirs: list[str] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif entry.is_file():
+                files.append(entry.name)
+
+    if mtime_ns >= racy_after_ns:
+        mtime_ns = None
+    return DirEntry(mtime_ns, files, subdirs)
+
+
+def scan_tree(root: str, cached: dict[str, DirEntry] | None = None, workers: int | None = None) -> dict[str, DirEntry]:
+    """List every directory below ``root``, reusing unchanged cached listings.
+
+    Returns a mapping of directory path (relative to ``root``, "" for the
+    root itself) to its listing.
+    """
+
+    cached = cached or {}
+    racy_after_ns = time.time_ns() - _RACY_WINDOW_NS
+    tree: dict[str, DirEntry] = {}
+
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        pending: dict[Future, str] = {}
+
+        def submit(rel: str) -> None:
+            future = pool.submit(_scan_dir, os.path.join(root, rel), cached.get(rel), racy_after_ns)
+            pending[future] = rel
+
+        submit("")
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel = pending.pop(future)
+                try:
+                    entry = future.result()
+                except FileNotFoundError:
+                    # Removed while we were scanning.
+                    continue
+                tree[rel] = entry
+                for name in entry.subdirs:
+                    submit(os.path.join(rel, name) if rel else name)
+
+    return tree
+
+
+def load_cache(cache_path: str, root: str) -> dict[str, DirEntry]:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CACHE_VERSION:
+        return {}
+    entries = data.get("roots", {}).get(os.path.abspath(root), {})
+    return {rel: DirEntry(*values) for rel, values in entries.items()}
+
+
+def save_cache(cache_path: str, root: str, tree: dict[str, DirEntry]) -> None:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CACHE_VERSION:
+            raise ValueError
+    except (OSError, ValueError):
+        data = {"version": CACHE_VERSION, "roots": {}}
+
+    data["roots"][os.path.abspath(root)] = {
+        rel: [entry.mtime_ns, entry.files, entry.subdirs] for rel, entry in tree.items()
+    }
+
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, cache_path)
+
+
+def build_audio_index(root: str, cache_path: str | None = None, workers: int | None = None) -> dict[str, DirEntry]:
+    """Scan ``root`` (incrementally, if ``cache_path`` is given) and return its listing."""
+
+    cached = load_cache(cache_path, root) if cache_path else {}
+    tree = scan_tree(root, cached, workers)
+    if cache_path:
+        save_cache(cache_path, root, tree)
+    return tree
+
+
+def files_by_ext(root: str, tree: dict[str, DirEntry], exts: Iterable[str]) -> dict[str, dict[str, list[str]]]:
+    """Sort the files of one scan into per-extension buckets in a single pass.
+
+    Returns ``{ext: {lower-cased stem: [full paths]}}`` for every extension
+    in ``exts`` (extensions are compared case-insensitively).
+    """
+
+    buckets: dict[str, dict[str, list[str]]] = {ext.lower(): {} for ext in exts}
+    for rel, entry in tree.items():
+        directory = os.path.join(root, rel) if rel else root
+        for name in entry.files:
+            stem, file_ext = os.path.splitext(name)
+            bucket = buckets.get(file_ext.lower())
+            if bucket is None:
+                continue
+            bucket.setdefault(stem.strip().lower(), []).append(os.path.join(directory, name))
+    return buckets
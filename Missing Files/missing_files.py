@@ -1,27 +1,26 @@
 import argparse
 import csv
+import io
 import os
 import re
-import subprocess
 import sys
-from typing import Iterable
+import threading
+import time
+from collections import Counter
+from itertools import islice
 
-# Function to check if a package is installed
-def check_and_install(package):
-    try:
-        __import__(package)
-    except ImportError:
-        user_input = input(f"The package '{package}' is not installed. Do you want to install it? (yes/no): ").strip().lower()
-        if user_input == 'yes':
-            subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
-        else:
-            print(f"The package '{package}' is required. Exiting.")
-            exit()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Check and install necessary packages
-check_and_install('pandas')
+from audio_index import DirEntry, build_audio_index, files_by_ext, save_cache, scan_tree
+from dialogue_export import format_rows
+from dialogue_store import iter_rows, read_header
 
-import pandas as pd
+try:
+    # Optional: event-driven watch mode. Without it, --watch falls back to polling.
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
 
 parser = argparse.ArgumentParser(description="Detect missing audio files based on a dialogue.tab export")
 parser.add_argument(
@@ -48,64 +47,49 @@ parser.add_argument(
     default=".mp3",
     help="Audio file extension to check (default: .mp3)",
 )
-args = parser.parse_args()
-
-
-def _read_dialogue_tab_robust(path: str) -> pd.DataFrame:
-    """Read a Ren'Py dialogue.tab export robustly.
-
-    Ren'Py exports are tab-separated but may contain malformed quoting.
-    This parser never drops rows due to quoting issues and tries to keep
-    the expected 6-column layout stable:
-      Identifier, Character, Dialogue, Filename, Line Number, Ren'Py Script
-    """
-
-    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
-        header_line = f.readline()
-        if not header_line:
-            raise ValueError(f"Empty dialogue file: {path}")
-
-        header_line = header_line.lstrip("\ufeff").rstrip("\n\r")
-        headers = header_line.split("\t")
-        expected_cols = len(headers)
-        if expected_cols < 3:
-            raise ValueError(f"Unexpected header in {path}: {headers}")
-
-        rows: list[list[str]] = []
-        for raw_line in f:
-            line = raw_line.rstrip("\n\r")
-            if not line:
-                continue
-            parts = line.split("\t")
-
-            # If there are embedded tabs inside Dialogue, merge them back.
-            if len(parts) > expected_cols and expected_cols >= 6:
-                # Keep: Identifier, Character, (Dialogue...), Filename, Line Number, Ren'Py Script
-                head = parts[:2]
-                tail = parts[-3:]
-                middle = parts[2:-3]
-                parts = head + ["\t".join(middle)] + tail
-
-            if len(parts) < expected_cols:
-                parts = parts + [""] * (expected_cols - len(parts))
-            elif len(parts) > expected_cols:
-                # As a fallback, merge all extras into the last column.
-                parts = parts[: expected_cols - 1] + ["\t".join(parts[expected_cols - 1 :])]
-
-            # Repair common corruption: narration text ends up in Character.
-            # If Character isn't a short code and looks like a sentence, shift it into Dialogue.
-            if expected_cols >= 3:
-                character = parts[1]
-                dialogue = parts[2]
-                if character and (len(character) > 4 or " " in character) and character not in {"centered"}:
-                    # Only do this when Dialogue looks like it was split off.
-                    if dialogue and len(dialogue) < 10:
-                        parts[2] = (character + " " + dialogue).strip()
-                        parts[1] = ""
-
-            rows.append(parts)
-
-    return pd.DataFrame(rows, columns=headers)
+parser.add_argument(
+    "--langs",
+    dest="langs",
+    nargs="+",
+    metavar="LANG",
+    help=(
+        "Batch mode: check several tl language folders in one pass (use '-' for the main audio folder). "
+        "Writes a language x extension matrix instead of the single-language reports."
+    ),
+)
+parser.add_argument(
+    "--exts",
+    dest="exts",
+    nargs="+",
+    metavar="EXT",
+    help="Batch mode: audio file extensions to check (default: the value of --ext)",
+)
+parser.add_argument(
+    "--watch",
+    action="store_true",
+    help=(
+        "Keep running and update the reports whenever audio files or the dialogue file change "
+        "(uses the 'watchdog' package if installed, otherwise polls)"
+    ),
+)
+parser.add_argument(
+    "--interval",
+    type=float,
+    default=2.0,
+    help="Watch mode: seconds between checks for changes (default: 2)",
+)
+parser.add_argument(
+    "--no-cache",
+    dest="use_cache",
+    action="store_false",
+    help="Rescan the whole audio folder instead of reusing the cached index of unchanged directories",
+)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of threads used to scan the audio folder (default: based on CPU count)",
+)
 
 
 def _prompt_if_missing(value: str | None, prompt: str) -> str:
@@ -166,19 +150,20 @@ def _resolve_game_dir(base_dir: str) -> str:
 _TL_LANG_RE = re.compile(r"(?:^|/)game/tl/([^/]+)/", flags=re.IGNORECASE)
 
 
-def _infer_lang_from_dialogue(df: pd.DataFrame) -> str | None:
-    if "Filename" not in df.columns:
+def _infer_lang_from_dialogue(dialogue_path: str) -> str | None:
+    if "Filename" not in read_header(dialogue_path):
         return None
-    values = df["Filename"].dropna().astype(str).tolist()
-    langs: list[str] = []
-    for value in values[:5000]:
+    rows = iter_rows(dialogue_path, ("Identifier", "Filename"))
+    values = (filename for identifier, filename in rows if identifier.strip() and filename)
+    langs: Counter[str] = Counter()
+    for value in islice(values, 5000):
         match = _TL_LANG_RE.search(value.replace("\\", "/"))
         if match:
-            langs.append(match.group(1))
+            langs[match.group(1)] += 1
     if not langs:
         return None
     # Most common
-    return max(set(langs), key=langs.count)
+    return langs.most_common(1)[0][0]
 
 
 def _audio_dir(game_dir: str, lang: str | None) -> str:
@@ -187,100 +172,55 @@ def _audio_dir(game_dir: str, lang: str | None) -> str:
     return os.path.join(game_dir, "audio", "voice")
 
 
-base_dir = args.base_dir or _pick_base_dir_from_defaults()
-game_dir = _resolve_game_dir(base_dir)
-
-# Set the path to the dialogue.tab file
-dialogue_path = args.dialogue_path or os.path.join(os.path.abspath(base_dir), "dialogue.tab")
+def _normalize_identifier(name: str) -> str:
+    return name.strip().lower()
 
-if not os.path.exists(dialogue_path):
-    print(f"The file '{dialogue_path}' does not exist. Please check the path and try again.")
-    exit()
 
-# Read the text file with tab separator (robust against malformed quoting)
-spreadsheet = _read_dialogue_tab_robust(dialogue_path)
+def _normalize_ext(ext: str) -> str:
+    if not ext.startswith("."):
+        ext = "." + ext
+    return ext.lower()
 
-# Column name in the spreadsheet that contains the audio file names
-file_name_column = "Identifier"
 
-if file_name_column not in spreadsheet.columns:
-    print(
-        f"Expected column '{file_name_column}' not found in '{dialogue_path}'. "
-        f"Columns found: {', '.join(spreadsheet.columns.astype(str))}"
+def _load_identifiers(dialogue_path: str, file_name_column: str) -> set[str]:
+    # Stream the dialogue rows (robust against malformed quoting) and keep only the identifiers
+    return set(
+        key
+        for (identifier,) in iter_rows(dialogue_path, (file_name_column,))
+        if (key := _normalize_identifier(identifier))
     )
-    exit()
-
-spreadsheet[file_name_column] = spreadsheet[file_name_column].astype(str).str.strip()
-spreadsheet = spreadsheet[spreadsheet[file_name_column].notna() & (spreadsheet[file_name_column] != "")]
-
-selected_lang = args.lang
-if selected_lang is None:
-    inferred = _infer_lang_from_dialogue(spreadsheet)
-    if inferred:
-        raw = input(
-            f"Detected language folder from dialogue: '{inferred}'. Press Enter to use it, or type a different one, or leave blank for main language audio: "
-        ).strip()
-        selected_lang = raw or inferred
-    else:
-        raw = input(
-            "Optional: enter tl language folder to check (e.g., English). Leave blank to check main audio folder: "
-        ).strip()
-        selected_lang = raw or None
 
-audio_folder_path = _audio_dir(game_dir, selected_lang)
 
-if not os.path.exists(audio_folder_path):
-    print(f"The audio folder '{audio_folder_path}' does not exist. Please check the path and try again.")
-    exit()
+def _audio_index_cache_path(script_dir: str, args) -> str | None:
+    return os.path.join(script_dir, "audio_index_cache.json") if args.use_cache else None
 
-ext = args.ext
-if not ext.startswith("."):
-    ext = "." + ext
-ext = ext.lower()
 
+def _scan_audio(
+    audio_folder_path: str, exts: list[str], script_dir: str, args
+) -> tuple[dict[str, DirEntry], dict[str, dict[str, list[str]]]]:
+    # Recursively gather audio files and normalize case (Windows is case-insensitive, but Python sets are not).
+    # Directory listings are cached by mtime, so only directories that changed since the last run are rescanned.
+    audio_tree = build_audio_index(audio_folder_path, _audio_index_cache_path(script_dir, args), args.workers)
+    return audio_tree, files_by_ext(audio_folder_path, audio_tree, exts)
 
-def _normalize_identifier(name: str) -> str:
-    return name.strip().lower()
 
+def _write_if_changed(path: str, content: str) -> bool:
+    """Write ``content`` to ``path`` unless the file already holds exactly that."""
 
-# Recursively gather audio files and normalize case (Windows is case-insensitive, but Python sets are not)
-audio_files_map: dict[str, list[str]] = {}
-for root, _dirs, files in os.walk(audio_folder_path):
-    for file in files:
-        if os.path.splitext(file)[1].lower() != ext:
-            continue
-        stem = os.path.splitext(file)[0]
-        key = _normalize_identifier(stem)
-        audio_files_map.setdefault(key, []).append(os.path.join(root, file))
-
-audio_files = set(audio_files_map.keys())
-spreadsheet_files = set(_normalize_identifier(v) for v in spreadsheet[file_name_column].astype(str).tolist())
-
-missing_files = spreadsheet_files - audio_files
-extra_files = audio_files - spreadsheet_files
-
-# Output the missing files
-if missing_files:
-    print("The following files are missing from the folder:")
-    for file in sorted(missing_files):
-        print(file)
-else:
-    print("No files are missing.")
-
-# Output the extra files
-if extra_files:
-    print("\nThe following files are in the folder but not listed in the spreadsheet:")
-    for file in sorted(extra_files):
-        print(file)
-else:
-    print("All files in the folder are listed in the spreadsheet.")
-
-script_dir = os.path.dirname(os.path.abspath(__file__))
-extra_files_csv_path = os.path.join(script_dir, "extra_files.csv")
-
-# Always write extra files report (even if empty)
-with open(extra_files_csv_path, "w", newline="", encoding="utf-8") as csvfile:
-    writer = csv.writer(csvfile)
+    try:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write(content)
+    return True
+
+
+def _format_extra_files_csv(extra_files: set[str], audio_files_map: dict[str, list[str]]) -> str:
+    buffer = io.StringIO(newline="")
+    writer = csv.writer(buffer)
     writer.writerow(["identifier_normalized", "path"])
     for file_key in sorted(extra_files):
         paths = audio_files_map.get(file_key, [])
@@ -289,31 +229,344 @@ with open(extra_files_csv_path, "w", newline="", encoding="utf-8") as csvfile:
             continue
         for path in sorted(paths):
             writer.writerow([file_key, path])
+    return buffer.getvalue()
+
+
+def _format_missing_tab(dialogue_path: str, headers: list[str], file_name_index: int, missing_files: set[str]) -> str:
+    # Filter the spreadsheet to keep only rows with missing files (case-insensitive)
+    def _missing_rows():
+        for row in iter_rows(dialogue_path):
+            identifier = row[file_name_index].strip()
+            if identifier and _normalize_identifier(identifier) in missing_files:
+                row[file_name_index] = identifier
+                yield row
+
+    return format_rows(headers, _missing_rows())
+
+
+def _run_single(args, game_dir: str, dialogue_path: str, headers: list[str], file_name_index: int) -> None:
+    selected_lang = args.lang
+    if selected_lang is None:
+        inferred = _infer_lang_from_dialogue(dialogue_path)
+        if inferred:
+            raw = input(
+                f"Detected language folder from dialogue: '{inferred}'. Press Enter to use it, or type a different one, or leave blank for main language audio: "
+            ).strip()
+            selected_lang = raw or inferred
+        else:
+            raw = input(
+                "Optional: enter tl language folder to check (e.g., English). Leave blank to check main audio folder: "
+            ).strip()
+            selected_lang = raw or None
+
+    audio_folder_path = _audio_dir(game_dir, selected_lang)
+
+    if not os.path.exists(audio_folder_path):
+        print(f"The audio folder '{audio_folder_path}' does not exist. Please check the path and try again.")
+        exit()
+
+    ext = _normalize_ext(args.ext)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    audio_tree, buckets = _scan_audio(audio_folder_path, [ext], script_dir, args)
+    audio_files_map = buckets[ext]
+    audio_files = set(audio_files_map.keys())
+    spreadsheet_files = _load_identifiers(dialogue_path, headers[file_name_index])
+
+    missing_files = spreadsheet_files - audio_files
+    extra_files = audio_files - spreadsheet_files
+
+    # Output the missing files
+    if missing_files:
+        print("The following files are missing from the folder:")
+        for file in sorted(missing_files):
+            print(file)
+    else:
+        print("No files are missing.")
+
+    # Output the extra files
+    if extra_files:
+        print("\nThe following files are in the folder but not listed in the spreadsheet:")
+        for file in sorted(extra_files):
+            print(file)
+    else:
+        print("All files in the folder are listed in the spreadsheet.")
+
+    # Always write extra files report (even if empty)
+    extra_files_csv_path = os.path.join(script_dir, "extra_files.csv")
+    _write_if_changed(extra_files_csv_path, _format_extra_files_csv(extra_files, audio_files_map))
+
+    # Save the filtered rows to a new tab-separated file next to this script.
+    missing_tab_path = os.path.join(script_dir, "dialogue_missing.tab")
+    _write_if_changed(missing_tab_path, _format_missing_tab(dialogue_path, headers, file_name_index, missing_files))
+
+    # Display summary
+    print("\nSummary:")
+    print(f"Dialogue: {dialogue_path}")
+    print(f"Game dir: {game_dir}")
+    print(f"Audio dir: {audio_folder_path}")
+    print(f"Extension: {ext}")
+    print(f"Number of missing files: {len(missing_files)}")
+    print(f"Number of files not listed in the spreadsheet: {len(extra_files)}")
+    print(f"Extra files CSV: {extra_files_csv_path}")
+    print(f"Missing files TAB: {missing_tab_path}")
+
+    if args.watch:
+        _watch(
+            args,
+            dialogue_path,
+            headers,
+            file_name_index,
+            audio_folder_path,
+            ext,
+            audio_tree,
+            audio_files_map,
+            spreadsheet_files,
+            missing_files,
+            extra_files,
+        )
+
+
+def _apply_tree_changes(
+    audio_folder_path: str,
+    old_tree: dict[str, DirEntry],
+    new_tree: dict[str, DirEntry],
+    ext: str,
+    audio_files_map: dict[str, list[str]],
+) -> set[str]:
+    """Patch ``audio_files_map`` with the files that differ between two scans.
+
+    Returns the identifiers whose set of paths changed.
+    """
+
+    touched: set[str] = set()
+    for rel in old_tree.keys() | new_tree.keys():
+        old = old_tree.get(rel)
+        new = new_tree.get(rel)
+        if old is new:
+            # scan_tree hands back the cached listing for unchanged directories.
+            continue
+        old_files = set(old.files) if old else set()
+        new_files = set(new.files) if new else set()
+
+        removed = files_by_ext(audio_folder_path, {rel: DirEntry(None, list(old_files - new_files), [])}, [ext])[ext]
+        for key, paths in removed.items():
+            remaining = [path for path in audio_files_map.get(key, []) if path not in paths]
+            if remaining:
+                audio_files_map[key] = remaining
+            else:
+                audio_files_map.pop(key, None)
+            touched.add(key)
+
+        added = files_by_ext(audio_folder_path, {rel: DirEntry(None, list(new_files - old_files), [])}, [ext])[ext]
+        for key, paths in added.items():
+            audio_files_map.setdefault(key, []).extend(paths)
+            touched.add(key)
+
+    return touched
+
+
+def _watch(
+    args,
+    dialogue_path: str,
+    headers: list[str],
+    file_name_index: int,
+    audio_folder_path: str,
+    ext: str,
+    audio_tree: dict[str, DirEntry],
+    audio_files_map: dict[str, list[str]],
+    spreadsheet_files: set[str],
+    missing_files: set[str],
+    extra_files: set[str],
+) -> None:
+    """Keep the comparison in memory and update it incrementally as files change."""
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    extra_files_csv_path = os.path.join(script_dir, "extra_files.csv")
+    missing_tab_path = os.path.join(script_dir, "dialogue_missing.tab")
+
+    changed = threading.Event()
+    observer = None
+    if Observer is not None:
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                changed.set()
+
+        observer = Observer()
+        observer.schedule(_Handler(), audio_folder_path, recursive=True)
+        observer.start()
+        print(f"\nWatching {audio_folder_path} for changes (Ctrl+C to stop)...")
+    else:
+        print(f"\nPolling {audio_folder_path} every {args.interval:g}s for changes (Ctrl+C to stop)...")
+
+    dialogue_mtime_ns = os.stat(dialogue_path).st_mtime_ns
+    written_missing = set(missing_files)
+
+    try:
+        while True:
+            changed.wait(args.interval)
+            changed.clear()
+
+            dialogue_changed = False
+            try:
+                mtime_ns = os.stat(dialogue_path).st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = dialogue_mtime_ns
+            if mtime_ns != dialogue_mtime_ns:
+                dialogue_mtime_ns = mtime_ns
+                dialogue_changed = True
+                spreadsheet_files = _load_identifiers(dialogue_path, headers[file_name_index])
+
+            # Only directories whose mtime changed are listed again.
+            new_tree = scan_tree(audio_folder_path, audio_tree, args.workers)
+            touched = _apply_tree_changes(audio_folder_path, audio_tree, new_tree, ext, audio_files_map)
+            audio_tree = new_tree
+            if not touched and not dialogue_changed:
+                continue
+
+            if dialogue_changed:
+                audio_files = set(audio_files_map.keys())
+                new_missing = spreadsheet_files - audio_files
+                new_extra = audio_files - spreadsheet_files
+            else:
+                new_missing = set(missing_files)
+                new_extra = set(extra_files)
+                for key in touched:
+                    in_folder = key in audio_files_map
+                    in_sheet = key in spreadsheet_files
+                    if in_sheet and not in_folder:
+                        new_missing.add(key)
+                    else:
+                        new_missing.discard(key)
+                    if in_folder and not in_sheet:
+                        new_extra.add(key)
+                    else:
+                        new_extra.discard(key)
+
+            timestamp = time.strftime("%H:%M:%S")
+            for key in sorted(missing_files - new_missing):
+                print(f"[{timestamp}] now present: {key}")
+            for key in sorted(new_missing - missing_files):
+                print(f"[{timestamp}] now missing: {key}")
+            for key in sorted(new_extra - extra_files):
+                print(f"[{timestamp}] not listed in the spreadsheet: {key}")
+            for key in sorted(extra_files - new_extra):
+                print(f"[{timestamp}] no longer unlisted: {key}")
+            missing_files, extra_files = new_missing, new_extra
+
+            if _write_if_changed(extra_files_csv_path, _format_extra_files_csv(extra_files, audio_files_map)):
+                print(f"[{timestamp}] Updated {extra_files_csv_path}")
+            if dialogue_changed or missing_files != written_missing:
+                content = _format_missing_tab(dialogue_path, headers, file_name_index, missing_files)
+                written_missing = set(missing_files)
+                if _write_if_changed(missing_tab_path, content):
+                    print(f"[{timestamp}] Updated {missing_tab_path}")
+            print(
+                f"[{timestamp}] Number of missing files: {len(missing_files)}, "
+                f"not listed in the spreadsheet: {len(extra_files)}"
+            )
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        cache_path = _audio_index_cache_path(script_dir, args)
+        if cache_path:
+            save_cache(cache_path, audio_folder_path, audio_tree)
+
+
+def _run_batch(args, game_dir: str, dialogue_path: str, headers: list[str], file_name_index: int) -> None:
+    """Check every language x extension combination with one dialogue parse and one scan per language."""
+
+    langs = [None if lang == "-" else lang for lang in args.langs]
+    exts = list(dict.fromkeys(_normalize_ext(ext) for ext in (args.exts or [args.ext])))
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    spreadsheet_files = _load_identifiers(dialogue_path, headers[file_name_index])
+
+    # (lang label, ext) -> (missing, extra)
+    results: dict[tuple[str, str], tuple[set[str], set[str]]] = {}
+    for lang in langs:
+        label = lang or "(main)"
+        audio_folder_path = _audio_dir(game_dir, lang)
+        if not os.path.exists(audio_folder_path):
+            print(f"The audio folder '{audio_folder_path}' does not exist. Skipping {label}.")
+            continue
+
+        _audio_tree, buckets = _scan_audio(audio_folder_path, exts, script_dir, args)
+        for ext in exts:
+            audio_files = set(buckets[ext].keys())
+            results[(label, ext)] = (spreadsheet_files - audio_files, audio_files - spreadsheet_files)
+
+    # One row per identifier that is missing or extra anywhere, one column per language/extension.
+    columns = list(results)
+    flagged: dict[str, list[str]] = {}
+    for column_index, column in enumerate(columns):
+        missing_files, extra_files = results[column]
+        for status, keys in (("missing", missing_files), ("extra", extra_files)):
+            for key in keys:
+                flagged.setdefault(key, [""] * len(columns))[column_index] = status
+
+    matrix_csv_path = os.path.join(script_dir, "missing_matrix.csv")
+    with open(matrix_csv_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["identifier_normalized"] + [f"{label} {ext}" for label, ext in columns])
+        for key in sorted(flagged):
+            writer.writerow([key] + flagged[key])
+
+    # Display summary
+    print("\nSummary (missing / not listed in the spreadsheet):")
+    print(f"Dialogue: {dialogue_path}")
+    print(f"Game dir: {game_dir}")
+    width = max([len(label) for label, _ext in columns] + [8])
+    print("  " + "Language".ljust(width) + "".join(ext.rjust(16) for ext in exts))
+    for lang in langs:
+        label = lang or "(main)"
+        if (label, exts[0]) not in results:
+            continue
+        cells = []
+        for ext in exts:
+            missing_files, extra_files = results[(label, ext)]
+            cells.append(f"{len(missing_files)} / {len(extra_files)}".rjust(16))
+        print("  " + label.ljust(width) + "".join(cells))
+    print(f"Matrix CSV: {matrix_csv_path}")
+
+
+def main() -> None:
+    args = parser.parse_args()
+
+    base_dir = args.base_dir or _pick_base_dir_from_defaults()
+    game_dir = _resolve_game_dir(base_dir)
+
+    # Set the path to the dialogue.tab file
+    dialogue_path = args.dialogue_path or os.path.join(os.path.abspath(base_dir), "dialogue.tab")
+
+    if not os.path.exists(dialogue_path):
+        print(f"The file '{dialogue_path}' does not exist. Please check the path and try again.")
+        exit()
+
+    # Column name in the spreadsheet that contains the audio file names
+    file_name_column = "Identifier"
+
+    headers = read_header(dialogue_path)
+    if file_name_column not in headers:
+        print(
+            f"Expected column '{file_name_column}' not found in '{dialogue_path}'. "
+            f"Columns found: {', '.join(headers)}"
+        )
+        exit()
+    file_name_index = headers.index(file_name_column)
+
+    if args.langs:
+        if args.watch:
+            print("--watch checks a single language and extension; it cannot be combined with --langs.")
+            exit()
+        _run_batch(args, game_dir, dialogue_path, headers, file_name_index)
+    else:
+        _run_single(args, game_dir, dialogue_path, headers, file_name_index)
 
-# Filter the spreadsheet to keep only rows with missing files (case-insensitive)
-missing_keys = set(missing_files)
-missing_files_df = spreadsheet[
-    spreadsheet[file_name_column].astype(str).map(_normalize_identifier).isin(missing_keys)
-]
-
-# Save the filtered dataframe to a new tab-separated file next to this script.
-# Quoting ensures any embedded tabs/newlines in fields won't corrupt column alignment.
-missing_tab_path = os.path.join(script_dir, "dialogue_missing.tab")
-missing_files_df.to_csv(
-    missing_tab_path,
-    sep="\t",
-    index=False,
-    quoting=csv.QUOTE_MINIMAL,
-    escapechar="\\",
-)
 
-# Display summary
-print("\nSummary:")
-print(f"Dialogue: {dialogue_path}")
-print(f"Game dir: {game_dir}")
-print(f"Audio dir: {audio_folder_path}")
-print(f"Extension: {ext}")
-print(f"Number of missing files: {len(missing_files)}")
-print(f"Number of files not listed in the spreadsheet: {len(extra_files)}")
-print(f"Extra files CSV: {extra_files_csv_path}")
-print(f"Missing files TAB: {missing_tab_path}")
+if __name__ == "__main__":
+    main()
@@ -1,169 +1,954 @@
 # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
-# *  VNavigator - The RenPy Visual Novel story visualization tool           * 
+# *  VNavigator - The RenPy Visual Novel story visualization tool           *
 # * ----------------------------------------------------------------------- *
-# *  This tool parses RenPy story files (.rpy) for label/jump statements    *
+# *  This tool parses RenPy story files (.rpy) for labels, jumps and calls  *
 # *  and creates a .graphml flowchart file readable by yEd Graph Editor.    *
 # *  Create a new folder inside the RenPy game's "game" directory, copy     *
 # *  this file (VNavigator.py) into it and execute it.                      *
+# *  To open labels from yEd, double-click vnav_protocol.reg once; a click  *
+# *  on a node's URL then opens the script at the label in Atom.            *
 # * ----------------------------------------------------------------------- *
 # *  Version history:                                                       *
 # *  24 Jan 2023 V0.9 First version                                         *
+# *  18 Oct 2026 V1.0 Scripts in subfolders, parallel parsing, set lookups  *
+# *  18 Oct 2026 V1.1 Parse cache: only changed scripts are re-parsed       *
+# *  18 Oct 2026 V1.2 Graph model, escaped GraphML, JSON and DOT output     *
+# *  18 Oct 2026 V1.3 One label index and launcher instead of .bat files    *
+# *  18 Oct 2026 V1.4 Calls, menu choices, conditions, fall-through flow    *
+# *  18 Oct 2026 V1.5 --analyze: reachability, loops, endings, route words  *
 # * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * * *
 
 # Import required modules:
+import argparse
+import csv
+import json
 import os
+import re
+import subprocess
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import glob
-
-# Get required directories/folders:
-cwd = os.getcwd()               # Where VNavigator files are stored
-path = Path(cwd) 
-pwd = path.parent.absolute()    # Where .rpy files are stored
-folder = format(cwd)
-folder = folder[folder.rfind('\\')+1:] # Current folder name
-atom = format(pwd)              # Plain-text path of Atom editor 
-atom = atom[:atom.find("renpy\\")+6]+'atom\\atom-windows\\atom.exe'
-
-# Print all directories:
-print("Working directory: {0}".format(cwd)) 
-print("Parent directory:  {0}".format(pwd)) 
-print('Folder name : '+folder)
-print("Atom path: "+atom) 
-
-# Initialize variables/lists:
-edges = 0                       # Global counter for edges (arrows) 
-edgli = []                      # XML list of edges (arrows)
-nodli = []                      # XML list of nodes (boxes)
-nchek = []                      # List of labels mentioned in jumps
-echek = []                      # List of labels 
-
-# Retrieve contents of all .rpy files:
-os.chdir(pwd)                   # Go to game scripts folder
-extension = '*.rpy'             # RenPy game script files
-
-for file in glob.glob(extension):
-    print('File name : ' + file)
-
-    if file == 'gui.rpy' or file == 'options.rpy' or file == 'screens.rpy':
-        print('File skipped : ' + file)
-        continue
-        
-    with open(file, 'r') as f:
-        index = 0               # line counter, reset for each file
-        
-        lines = f.readlines()
-        for line in lines:
-            index += 1          # Increment line counter
-            line = line.lstrip()# Remove leading spaces
-            temp = line.lower() # Convert to lowercase
-
-            if temp[:5] == 'jump ' :
-                edges += 1      # Internal counter for edges/arrows
-                jumpp = line[5:]# Remove the "jump" command
-                jumpp = jumpp.lstrip()          # Remove leading spaces
-                jumpp = jumpp[:jumpp.find("#")] # Cut off any comments
-                jumpp = jumpp.rstrip()          # Remove trailing spaces
-                print('  '+str(index) + ' Jump to : ' + jumpp)
-                nchek.append(jumpp.lower())     # Remember labels used in jumps
-
-                # Add edge (arrow) from-to info:
-                edgli.append('    <edge id="e'+str(edges)+'" source="'+prlab.lower()+'" target="'+jumpp.lower()+'">\n')
-
-                # Add text on edge (arrow), if any:
-                if line.find("#") > 0 :             # A comment exists 
-                    jucom = line[line.find("#")+2:] # Save comment after "#" sign
-                    jucom = jucom.rstrip()          # Remove trailing spaces
-                    print('  Jump Comment : '+jucom)
-                    edgli.append('      <data key="d9">')
-                    edgli.append('        <y:PolyLineEdge>')
-                    edgli.append('          <y:Arrows source="none" target="standard"/>')
-                    edgli.append('          <y:EdgeLabel>'+jucom+'</y:EdgeLabel>')
-                    edgli.append('        </y:PolyLineEdge>')
-                    edgli.append('      </data>')
-                
-                edgli.append('    </edge>\n')
-                
-            if temp[:6] == 'label ' :
-                label = line[6:]                # Remove the "label" command
-                label = label[:label.find(":")] # Cut off after colon
-                prlab = label                   # Remember previous (from) label
-                print(' '+str(index) +' Node label : ' + label) # Final label name
-                
-                if line.find('#') > 0:
-                    title = line[line.find('#')+1:] # Extract label comment
-                    title = title.lstrip()      # Remove leading spaces
-                    title = title.rstrip()      # Remove trailing spaces
-                    print(' '+str(index) +' Node title : ' + title)
+from typing import NamedTuple
+from urllib.parse import quote, unquote
+from xml.sax.saxutils import escape, quoteattr
+
+SKIPPED_FILES = {'gui.rpy', 'options.rpy', 'screens.rpy'}
+SKIPPED_DIRS = {'tl', 'cache', 'saves', '__pycache__'}  # Not story scripts
+PARALLEL_MIN_FILES = 16         # Fewer files are parsed without a process pool
+CACHE_FILE = 'vnavigator_cache.json'    # Parsed scripts, stored next to the graph
+CACHE_VERSION = 3                       # Bump when the parsed records change
+RACY_WINDOW_NS = 2_000_000_000          # Files saved this recently are always re-parsed
+INDEX_FILE = 'labels.json'              # Label -> script:line, read by --open
+LAUNCHER_FILE = 'vnav_open.bat'         # Runs VNavigator.py --open <url>
+PROTOCOL_FILE = 'vnav_protocol.reg'     # Registers vnav: URLs to the launcher
+URL_SCHEME = 'vnav'
+
+
+class Label(NamedTuple):
+    name: str                   # Full label name (local labels as global.local)
+    line: int                   # Line number (1-based)
+    title: str                  # Comment after the label, shown in the node
+    lines: int = 0              # Dialogue lines up to the next label
+    words: int = 0              # Words in those lines (text tags not counted)
+
+
+class Jump(NamedTuple):
+    source: str | None          # Label the jump belongs to (None: before any label)
+    target: str                 # Destination label, or the expression of a dynamic jump
+    line: int
+    comment: str                # Comment after the jump, shown on the edge
+    kind: str                   # One of JUMP_KINDS
+    condition: str              # Menu choices / if conditions the jump is nested in
+
+
+JUMP_KINDS = ('jump', 'call', 'fall', 'jump expression', 'call expression')
+
+# Statements whose blocks hold no story flow:
+SKIPPED_BLOCKS = re.compile(r'(init\b.*\bpython|python|screen|transform|style|image|layeredimage|testcase)\b')
+# Opening quotes, brackets and comment signs outside of strings:
+_TOKEN = re.compile(r'"""|\'\'\'|"|\'|[(\[{]|[)\]}]|#')
+_STRING_END = {q: re.compile(r'(?:[^\\]|\\.)*?' + re.escape(q), re.S) for q in ('"""', "'''", '"', "'")}
+_NAME = r'(\.?[A-Za-z_]\w*(?:\.\w+)?)'
+_LABEL = re.compile(r'label\s+' + _NAME)
+_MENU = re.compile(r'menu(?:\s+' + _NAME + r')?\s*(?:\(.*\))?\s*:$')
+_CHOICE = re.compile(r'(?:[A-Za-z_]\w*\s+)?("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')\s*(?:\(.*\))?\s*(?:if\s+(.+?))?\s*:$', re.S)
+_CONDITION = re.compile(r'(if|elif|while)\s+(.+?)\s*:$', re.S)
+_JUMP = re.compile(r'(jump|call)\s+(?:(expression)\s+(.+?)(?:\s+pass\s*\(.*\))?(?:\s+from\s+\w+)?|' + _NAME + r'\s*(?:\(.*\))?(?:\s+from\s+\w+)?)$', re.S)
+_RENPY_JUMP = re.compile(r'renpy\.(jump|call)\(\s*["\']' + _NAME + r'["\']')
+# Say statements: optional speaker and attributes, then the text:
+_STRING = r'("""(?:[^\\]|\\.)*?"""|\'\'\'(?:[^\\]|\\.)*?\'\'\'|"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')'
+_SAY = re.compile(r'(?:(?:[A-Za-z_][\w.]*|"(?:[^"\\]|\\.)*")(?:\s+[\w-]+)*\s+)?' + _STRING, re.S)
+_TEXT_TAGS = re.compile(r'\{[^}]*\}')
+STATEMENT_KEYWORDS = {
+    'camera', 'define', 'default', 'hide', 'image', 'init', 'nvl', 'pause', 'play', 'queue',
+    'scene', 'show', 'stop', 'translate', 'voice', 'window', 'with',
+}
+
+
+class Node(NamedTuple):
+    id: str                     # Lowercase label, used as node ID
+    label: str                  # Label as written in the script (or jump target if missing)
+    title: str
+    path: str | None            # Script of the label (None: label not found)
+    line: int
+    kind: str                   # 'label', 'missing' or 'dynamic' (jump/call expression)
+
+
+class Edge(NamedTuple):
+    id: str
+    source: str                 # Node IDs
+    target: str
+    comment: str
+    kind: str                   # One of JUMP_KINDS
+    condition: str
+
+    @property
+    def text(self):
+        """Text shown on the edge: its conditions and comment."""
+        return ' / '.join(part for part in (self.condition, self.comment) if part)
+
+
+class FileRecord(NamedTuple):
+    path: str                   # Script path relative to the game folder
+    labels: list
+    jumps: list
+
+
+def find_scripts(game_dir):
+    """Return all story scripts below game_dir (relative paths, sorted)."""
+    scripts = []
+    for root, dirs, files in os.walk(game_dir):
+        if root == game_dir:
+            dirs[:] = [d for d in dirs if d.lower() not in SKIPPED_DIRS]
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for file in files:
+            if not file.endswith('.rpy'):
+                continue
+            rel = os.path.relpath(os.path.join(root, file), game_dir)
+            if rel in SKIPPED_FILES:
+                print('File skipped : ' + rel)
+                continue
+            scripts.append(rel)
+    return sorted(scripts)
+
+
+def _logical_lines(f):
+    """Yield (line number, indent, code, comment) for every logical line of a script.
+
+    Physical lines are joined while a bracket or string is open, so that
+    statements spanning several lines are seen whole. Comments are split
+    off, except for # signs inside strings. Blank and comment-only lines
+    are not yielded.
+    """
+    parts = []
+    comment = ''
+    start = indent = 0
+    depth = 0
+    quote = None
+    for number, line in enumerate(f, start=1):
+        line = line.rstrip('\r\n')
+        if not parts:
+            start, indent = number, len(line) - len(line.lstrip(' '))
+        pos = 0
+        while True:
+            if quote:
+                m = _STRING_END[quote].match(line, pos)
+                if not m:
+                    pos = len(line)
+                    break
+                pos, quote = m.end(), None
+                continue
+            m = _TOKEN.search(line, pos)
+            if not m:
+                pos = len(line)
+                break
+            token = m.group()
+            if token == '#':
+                comment = comment or line[m.end():].strip()
+                pos = m.start()
+                break
+            if token in '([{':
+                depth += 1
+            elif token in ')]}':
+                depth = max(depth - 1, 0)
+            else:
+                quote = token
+            pos = m.end()
+        parts.append(line[:pos])
+        if quote or depth:
+            continue
+        code = '\n'.join(parts).strip()
+        if code:
+            yield start, indent, code, comment
+        parts = []
+        comment = ''
+    if parts and '\n'.join(parts).strip():
+        yield start, indent, '\n'.join(parts).strip(), comment
+
+
+class _Block:
+    """An open block (label, menu, choice, if/elif/else, while, ...) while parsing."""
+
+    __slots__ = ('indent', 'kind', 'condition', 'ends', 'branches_end')
+
+    def __init__(self, indent, kind, condition=''):
+        self.indent = indent
+        self.kind = kind
+        self.condition = condition
+        self.ends = False           # Control never runs past the end of the block
+        self.branches_end = True    # Menu/if: every choice or branch so far ends
+
+
+def _close(blocks):
+    """Pop the innermost block and tell its parent whether control leaves it."""
+    block = blocks.pop()
+    if not blocks:
+        return block
+    parent = blocks[-1]
+    if block.kind == 'choice':
+        parent.branches_end = parent.branches_end and block.ends
+    elif block.kind == 'menu':
+        parent.ends = block.branches_end
+    elif block.kind in ('if', 'elif', 'else'):
+        parent.branches_end = parent.branches_end and block.ends
+        # Without an else branch the condition may be false and control continues:
+        parent.ends = parent.branches_end if block.kind == 'else' else False
+    elif block.kind not in ('skip', 'label'):
+        parent.ends = False
+    return block
+
+
+def parse_file(game_dir, rel):
+    """Collect the labels and flow (jumps, calls, fall-throughs) of one script in a single pass."""
+    labels = []
+    jumps = []
+    dialogue = {}               # Label -> [lines, words]
+    blocks = []                 # Open blocks, innermost last
+    label = None                # Current (from) label
+    last_global = None          # For local labels (.name)
+
+    def full_name(name):
+        return (last_global or '') + name if name.startswith('.') else name
+
+    with open(os.path.join(game_dir, rel), 'r', encoding='utf-8', errors='replace') as f:
+        for index, indent, code, comment in _logical_lines(f):
+            closed = None
+            while blocks and blocks[-1].indent >= indent:
+                closed = _close(blocks)
+            if blocks and blocks[-1].kind == 'skip':
+                continue
+            block = blocks[-1] if blocks else None
+            condition = ' / '.join(b.condition for b in blocks if b.condition)
+            header = code.endswith(':')
+
+            m = _LABEL.match(code)
+            if m:
+                name = full_name(m.group(1))
+                if '.' not in name:
+                    last_global = name
+                # Control falls into the label from the statements above it:
+                ends = closed.ends if closed is not None and closed.kind == 'label' else block is None or block.ends
+                if label is not None and not ends:
+                    jumps.append(Jump(label, name, index, '', 'fall', condition))
+                labels.append(Label(name, index, comment))
+                label = name
+                blocks.append(_Block(indent, 'label'))
+                continue
+
+            m = _MENU.match(code)
+            if m:
+                if m.group(1):      # A named menu is also a label
+                    name = full_name(m.group(1))
+                    labels.append(Label(name, index, comment))
+                    if label is not None and not (block is None or block.ends):
+                        jumps.append(Jump(label, name, index, '', 'fall', condition))
+                    label = name
+                blocks.append(_Block(indent, 'menu'))
+                continue
+
+            if block is not None and block.kind == 'menu':
+                m = _CHOICE.match(code)
+                if m:
+                    text = m.group(1)[1:-1]
+                    blocks.append(_Block(indent, 'choice', text + (' if ' + m.group(2) if m.group(2) else '')))
+                continue        # Menu captions and set/with clauses
+
+            m = _CONDITION.match(code)
+            if m:
+                kind = m.group(1)
+                if kind == 'if' and block is not None:
+                    block.branches_end = True
+                blocks.append(_Block(indent, kind, ('while ' if kind == 'while' else '') + m.group(2)))
+                continue
+            if code == 'else:':
+                blocks.append(_Block(indent, 'else', 'else'))
+                continue
+
+            if header and SKIPPED_BLOCKS.match(code):
+                blocks.append(_Block(indent, 'skip'))
+                if block is not None:
+                    block.ends = False
+                continue
+
+            m = _JUMP.match(code)
+            if m is None and code.startswith('$'):
+                m = _RENPY_JUMP.search(code)
+                found = m and (m.group(1), '', '', m.group(2))
+            else:
+                found = m and m.groups()
+            if found and not (found[0] == 'call' and found[3] == 'screen'):
+                verb, expression, expr_text, name = found
+                if expression:
+                    jumps.append(Jump(label, ' '.join(expr_text.split()), index, comment, verb + ' expression', condition))
                 else:
-                    title = ''
-                    print(' '+str(index) +' No node title!')
-                    
-                if title[:1] == '-':            # Skip label if comment starts with "-" 
-                    print(' '+str(index) +' Node label skipped')
-                    continue                    # Do not add the node to the yEd file
-
-                nodli.append('    <node id="'+label.lower()+'">\n') # Use label as node ID
-                nodli.append('      <data key="d3" xml:space="preserve"><![CDATA['+format(cwd)+'\\'+label+'.bat]]></data>\n')
-                nodli.append('      <data key="d5">\n')             # d5 = node identifier
-                nodli.append('        <y:ShapeNode>\n')
-                nodli.append('          <y:Geometry height="36.0" width="240.0"/>')
-                nodli.append('          <y:Fill hasColor="false" transparent="false"/>')
-                nodli.append('          <y:NodeLabel>'+label+' / '+file[:len(file)-4]+'\n') # Show label in node
-                nodli.append(title+'</y:NodeLabel>\n')              # Show comment on 2nd line
-                nodli.append('        </y:ShapeNode>\n')
-                nodli.append('      </data>\n')
-                nodli.append('    </node>\n')
-
-                echek.append(label.lower())     # Collect list of labels
-
-                # Create batch files for every label (allows opening with Atom):
-                with open(format(cwd)+'\\'+label+'.bat', 'w') as g:
-                    g.write('@"'+atom+'" "'+format(pwd)+'\\'+file+':'+str(index)+'"')
+                    jumps.append(Jump(label, full_name(name), index, comment, verb, condition))
+                if block is not None:
+                    block.ends = verb == 'jump'
+                continue
+
+            m = _SAY.match(code)
+            if m and label is not None and code.split(None, 1)[0] not in STATEMENT_KEYWORDS:
+                width = 3 if m.group(1).startswith(('"""', "'''")) else 1
+                counts = dialogue.setdefault(label, [0, 0])
+                counts[0] += 1
+                counts[1] += len(_TEXT_TAGS.sub(' ', m.group(1)[width:-width]).split())
+
+            if header:
+                blocks.append(_Block(indent, 'other'))
+            if block is not None:
+                block.ends = code == 'return' or code.startswith('return ')
+
+    labels = [label._replace(lines=dialogue[label.name][0], words=dialogue[label.name][1])
+              if label.name in dialogue else label for label in labels]
+    return FileRecord(rel, labels, jumps)
+
+
+def _parse_task(task):
+    return parse_file(*task)
+
+
+def load_parse_cache(cache_path):
+    """Return {script: (mtime_ns, size, FileRecord)} from an earlier run."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != CACHE_VERSION:
+        return {}
+    cached = {}
+    for rel, entry in data.get('files', {}).items():
+        record = FileRecord(rel,
+                            [Label(*label) for label in entry['labels']],
+                            [Jump(*jump) for jump in entry['jumps']])
+        cached[rel] = (entry['mtime_ns'], entry['size'], record)
+    return cached
+
+
+def save_parse_cache(cache_path, entries):
+    data = {'version': CACHE_VERSION, 'files': {
+        rel: {'mtime_ns': mtime_ns, 'size': size, 'labels': record.labels, 'jumps': record.jumps}
+        for rel, (mtime_ns, size, record) in entries.items()
+    }}
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+
+
+def parse_files(game_dir, scripts, workers=None, cached=None):
+    """Parse every script, in parallel when worthwhile. Results keep the order of scripts.
+
+    Scripts whose mtime and size match their entry in cached are not read
+    again. Returns the records and the entries to store for the next run.
+    """
+    cached = cached or {}
+    racy_after_ns = time.time_ns() - RACY_WINDOW_NS
+    records = {}
+    entries = {}
+    tasks = []
+    for rel in scripts:
+        st = os.stat(os.path.join(game_dir, rel))
+        hit = cached.get(rel)
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size and st.st_mtime_ns < racy_after_ns:
+            records[rel] = hit[2]
+        else:
+            tasks.append((game_dir, rel))
+        # A file saved within the racy window may change again in the same mtime tick: no mtime, no later hit
+        mtime_ns = st.st_mtime_ns if st.st_mtime_ns < racy_after_ns else None
+        entries[rel] = (mtime_ns, st.st_size, records.get(rel))
+
+    if workers == 1 or len(tasks) < PARALLEL_MIN_FILES:
+        parsed = [_parse_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(_parse_task, tasks, chunksize=max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))))
+    for record in parsed:
+        records[record.path] = record
+        entries[record.path] = entries[record.path][:2] + (record,)
+
+    return [records[rel] for rel in scripts], entries, len(tasks)
+
+
+GRAPHML_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+    '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" xmlns:java="http://www.yworks.com/xml/yfiles-common/1.0/java" xmlns:sys="http://www.yworks.com/xml/yfiles-common/markup/primitives/2.0" xmlns:x="http://www.yworks.com/xml/yfiles-common/markup/2.0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:y="http://www.yworks.com/xml/graphml" xmlns:yed="http://www.yworks.com/xml/yed/3" xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns http://www.yworks.com/xml/schema/graphml/1.1/ygraphml.xsd">\n'
+    '  <!--Created by yEd 3.21.1-->\n'
+    '  <key for="port" id="d0" yfiles.type="portgraphics"/>\n'
+    '  <key for="port" id="d1" yfiles.type="portgeometry"/>\n'
+    '  <key for="port" id="d2" yfiles.type="portuserdata"/>\n'
+    '  <key attr.name="url" attr.type="string" for="node" id="d3"/>\n'
+    '  <key attr.name="description" attr.type="string" for="node" id="d4"/>\n'
+    '  <key for="node" id="d5" yfiles.type="nodegraphics"/>\n'
+    '  <key for="graphml" id="d6" yfiles.type="resources"/>\n'
+    '  <key attr.name="url" attr.type="string" for="edge" id="d7"/>\n'
+    '  <key attr.name="description" attr.type="string" for="edge" id="d8"/>\n'
+    '  <key for="edge" id="d9" yfiles.type="edgegraphics"/>\n'
+    '  <graph edgedefault="directed" id="G">\n'
+)
+GRAPHML_FOOTER = '  </graph>\n</graphml>\n'
+OUTPUT_FORMATS = ('graphml', 'json', 'dot')
+NODE_COLORS = {'missing': '#FFAAAA', 'dynamic': '#FFEE99'}
+EDGE_STYLES = {                 # Kind: (yEd line type, DOT style)
+    'jump': ('line', 'solid'),
+    'call': ('dashed', 'dashed'),
+    'fall': ('dotted', 'dotted'),
+    'jump expression': ('line', 'solid'),
+    'call expression': ('dashed', 'dashed'),
+}
+
+
+def build_graph(records, verbose=False):
+    """Link the parsed records into one graph: {node ID: Node} and a list of Edges.
+
+    Every label becomes one node (the first definition wins), every distinct
+    jump, call or fall-through one edge, every jump target without a label
+    one "missing" node and every jump/call expression one "dynamic" node.
+    Labels titled "- ..." are hidden: no node, and none of their jumps or
+    the jumps to them, so every edge ends at a node.
+    """
+    nodes = {}
+    edges = []
+    skipped = set()
+    seen_edges = set()
+    targets = {}                    # Labels mentioned in jumps, in order of first use
+
+    for record in records:
+        print('File name : ' + record.path)
+
+        for label in record.labels:
+            if verbose:
+                print(' '+str(label.line) +' Node label : ' + label.name)
+                print(' '+str(label.line) +(' Node title : ' + label.title if label.title else ' No node title!'))
+            if label.title[:1] == '-':            # Skip label if comment starts with "-"
+                if verbose:
+                    print(' '+str(label.line) +' Node label skipped')
+                skipped.add(label.name.lower())
+                continue                    # Do not add the node to the yEd file
+            node_id = label.name.lower()
+            if node_id in nodes:
+                first = nodes[node_id]
+                print(' '+str(label.line) +' Label defined again : ' + label.name + ' (first in ' + first.path + ':' + str(first.line) + ')')
+                continue
+            nodes[node_id] = Node(node_id, label.name, label.title, record.path, label.line, 'label')
+
+        for jump in record.jumps:
+            if verbose:
+                print('  '+str(jump.line) + ' ' + jump.kind.capitalize() + ' to : ' + jump.target + (' [' + jump.condition + ']' if jump.condition else ''))
+            if jump.source is None:
+                print('  '+str(jump.line) + ' ' + jump.kind.capitalize() + ' before any label skipped : ' + jump.target)
+                continue
+            target = jump.target.lower()
+            if jump.kind.endswith('expression'):
+                target = 'expression ' + target
+            key = (jump.source.lower(), target, jump.comment, jump.kind, jump.condition)
+            if key in seen_edges:
+                continue
+            seen_edges.add(key)
+            targets.setdefault(target, jump)
+            edges.append(Edge('e'+str(len(edges)+1), *key))
+
+    # Leave out the jumps from and to hidden labels (unless the name is also defined normally):
+    hidden = skipped - nodes.keys()
+    if hidden:
+        edges = [e for e in edges if e.source not in hidden and e.target not in hidden]
+        edges = [e._replace(id='e'+str(i)) for i, e in enumerate(edges, 1)]
 
     # Check for any missing jump destination (label) and add if needed:
-    for x in range(len(nchek)):
-        if not ( nchek[x] in echek ):
-            print(nchek[x]+' label not found')                
-
-            nodli.append('    <node id="'+nchek[x]+'">\n')  # Use label as node ID
-            nodli.append('      <data key="d5">\n')         # d5 = node identifier
-            nodli.append('        <y:ShapeNode>\n')
-            nodli.append('          <y:Geometry height="36.0" width="240.0"/>')            
-            nodli.append('          <y:Fill color="#FFAAAA" transparent="false"/>')            
-            nodli.append('          <y:NodeLabel>'+nchek[x]+' (!)</y:NodeLabel>\n') # Show label in node
-            nodli.append('        </y:ShapeNode>\n')
-            nodli.append('      </data>\n')
-            nodli.append('    </node>\n')
-
-# Write the collected data to an yEd file:
-
-os.chdir(cwd)   # Go to working subdirectory
-with open(folder+'.graphml', 'w') as f:
-    # Write static header info:
-    f.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n')
-    f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns" xmlns:java="http://www.yworks.com/xml/yfiles-common/1.0/java" xmlns:sys="http://www.yworks.com/xml/yfiles-common/markup/primitives/2.0" xmlns:x="http://www.yworks.com/xml/yfiles-common/markup/2.0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:y="http://www.yworks.com/xml/graphml" xmlns:yed="http://www.yworks.com/xml/yed/3" xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns http://www.yworks.com/xml/schema/graphml/1.1/ygraphml.xsd">\n')
-    f.write('  <!--Created by yEd 3.21.1-->\n')
-    f.write('  <key for="port" id="d0" yfiles.type="portgraphics"/>\n')
-    f.write('  <key for="port" id="d1" yfiles.type="portgeometry"/>\n')
-    f.write('  <key for="port" id="d2" yfiles.type="portuserdata"/>\n')
-    f.write('  <key attr.name="url" attr.type="string" for="node" id="d3"/>\n')
-    f.write('  <key attr.name="description" attr.type="string" for="node" id="d4"/>\n')
-    f.write('  <key for="node" id="d5" yfiles.type="nodegraphics"/>\n')
-    f.write('  <key for="graphml" id="d6" yfiles.type="resources"/>\n')
-    f.write('  <key attr.name="url" attr.type="string" for="edge" id="d7"/>\n')
-    f.write('  <key attr.name="description" attr.type="string" for="edge" id="d8"/>\n')
-    f.write('  <key for="edge" id="d9" yfiles.type="edgegraphics"/>\n')
-    f.write('  <graph edgedefault="directed" id="G">\n')
-
-    # Add list of nodes (labels):
-    for x in range(len(nodli)):
-        f.write(nodli[x])
-
-    # Add list of edges (jumps):
-    for x in range(len(edgli)):
-        f.write(edgli[x])
-
-    f.write('  </graph>\n')
-    f.write('</graphml>\n')
+    for node_id, jump in targets.items():
+        if node_id in nodes or node_id in hidden:
+            continue
+        if jump.kind.endswith('expression'):
+            nodes[node_id] = Node(node_id, jump.target, '', None, 0, 'dynamic')
+        else:
+            print(node_id+' label not found')
+            nodes[node_id] = Node(node_id, jump.target, '', None, 0, 'missing')
+
+    return nodes, edges
+
+
+def iter_graphml(nodes, edges):
+    """Yield the yEd GraphML document piece by piece. Nodes link to vnav:<label>."""
+    yield GRAPHML_HEADER
+    for node in nodes.values():
+        yield '    <node id='+quoteattr(node.id)+'>\n'
+        if node.path is None:
+            yield ('      <data key="d5">\n'
+                   '        <y:ShapeNode>\n'
+                   '          <y:Geometry height="36.0" width="240.0"/>\n'
+                   '          <y:Fill color="'+NODE_COLORS[node.kind]+'" transparent="false"/>\n'
+                   '          <y:NodeLabel>'+escape(node.id)+(' (!)' if node.kind == 'missing' else '')+'</y:NodeLabel>\n')
+        else:
+            yield ('      <data key="d3" xml:space="preserve">'+escape(label_url(node.id))+'</data>\n'
+                   '      <data key="d5">\n'
+                   '        <y:ShapeNode>\n'
+                   '          <y:Geometry height="36.0" width="240.0"/>\n'
+                   '          <y:Fill hasColor="false" transparent="false"/>\n'
+                   '          <y:NodeLabel>'+escape(node.label+' / '+node.path[:-4]+'\n'+node.title)+'</y:NodeLabel>\n')
+        yield ('        </y:ShapeNode>\n'
+               '      </data>\n'
+               '    </node>\n')
+    for edge in edges:
+        yield '    <edge id='+quoteattr(edge.id)+' source='+quoteattr(edge.source)+' target='+quoteattr(edge.target)+'>\n'
+        text = edge.text
+        if text or edge.kind != 'jump':
+            yield ('      <data key="d9">\n'
+                   '        <y:PolyLineEdge>\n'
+                   '          <y:LineStyle color="#000000" type="'+EDGE_STYLES[edge.kind][0]+'" width="1.0"/>\n'
+                   '          <y:Arrows source="none" target="standard"/>\n'
+                   +('          <y:EdgeLabel>'+escape(text)+'</y:EdgeLabel>\n' if text else '')+
+                   '        </y:PolyLineEdge>\n'
+                   '      </data>\n')
+        yield '    </edge>\n'
+    yield GRAPHML_FOOTER
+
+
+def iter_json(nodes, edges):
+    """Yield the graph as a JSON document: {"nodes": [...], "edges": [...]}."""
+    yield '{"nodes": ['
+    for i, node in enumerate(nodes.values()):
+        yield (',\n  ' if i else '\n  ')+json.dumps(node._asdict(), ensure_ascii=False)
+    yield '\n], "edges": ['
+    for i, edge in enumerate(edges):
+        yield (',\n  ' if i else '\n  ')+json.dumps(edge._asdict(), ensure_ascii=False)
+    yield '\n]}\n'
+
+
+def _dot_id(text):
+    return '"'+text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')+'"'
+
+
+def iter_dot(nodes, edges):
+    """Yield the graph in Graphviz DOT format."""
+    yield 'digraph story {\n  node [shape=box];\n'
+    for node in nodes.values():
+        if node.path is None:
+            text = node.id+(' (!)' if node.kind == 'missing' else '')
+            yield '  '+_dot_id(node.id)+' [label='+_dot_id(text)+', style=filled, fillcolor="'+NODE_COLORS[node.kind]+'"];\n'
+        else:
+            text = node.label+' / '+node.path[:-4]+('\n'+node.title if node.title else '')
+            yield '  '+_dot_id(node.id)+' [label='+_dot_id(text)+'];\n'
+    for edge in edges:
+        attrs = ['style='+EDGE_STYLES[edge.kind][1]]
+        if edge.text:
+            attrs.append('label='+_dot_id(edge.text))
+        yield '  '+_dot_id(edge.source)+' -> '+_dot_id(edge.target)+' ['+', '.join(attrs)+'];\n'
+    yield '}\n'
+
+
+def _adjacency(n, pairs):
+    """Compressed adjacency arrays: the neighbours of v are targets[offsets[v]:offsets[v+1]]."""
+    offsets = array('l', [0]) * (n + 1)
+    for source, _ in pairs:
+        offsets[source + 1] += 1
+    for v in range(n):
+        offsets[v + 1] += offsets[v]
+    targets = array('l', [0]) * len(pairs)
+    fill = offsets[:-1]
+    for source, target in pairs:
+        targets[fill[source]] = target
+        fill[source] += 1
+    return offsets, targets
+
+
+class StoryGraph:
+    """The graph in array form for analysis. Nodes are numbered in the order of nodes.
+
+    Flow edges (jumps and fall-throughs) and call edges are kept apart: a
+    call returns to its caller, so it adds the callee's dialogue to the
+    caller's route instead of continuing the route in the callee.
+    """
+
+    def __init__(self, nodes, edges, records):
+        self.ids = list(nodes)
+        self.kinds = [node.kind for node in nodes.values()]
+        n = len(self.ids)
+        index = {node_id: i for i, node_id in enumerate(self.ids)}
+        # Labels titled "- ..." are left out of nodes, but their jumps are still edges:
+        linked = [e for e in edges if e.source in index and e.target in index]
+        flow = [(index[e.source], index[e.target]) for e in linked if not e.kind.startswith('call')]
+        calls = [(index[e.source], index[e.target]) for e in linked if e.kind.startswith('call')]
+        self.flow = _adjacency(n, flow)
+        self.calls = _adjacency(n, calls)
+        self.called = bytearray(n)
+        for _, target in calls:
+            self.called[target] = 1
+
+        # Dialogue of each label, plus everything its calls say before returning:
+        self.lines = array('l', [0]) * n
+        self.words = array('l', [0]) * n
+        for record in records:
+            for label in record.labels:
+                v = index.get(label.name.lower())
+                if v is not None and nodes[self.ids[v]].path == record.path:
+                    self.lines[v] = label.lines
+                    self.words[v] = label.words
+        self.route_lines, self.route_words = self._with_calls()
+
+    def _with_calls(self):
+        """Add the dialogue of called labels (and their calls) to each label. Recursion counts once."""
+        offsets, targets = self.calls
+        n = len(self.ids)
+        lines = array('l', self.lines)
+        words = array('l', self.words)
+        done = bytearray(n)
+        for root in range(n):
+            if done[root] or offsets[root] == offsets[root + 1]:
+                continue
+            # Iterative post-order DFS over call edges:
+            work = [(root, offsets[root])]
+            done[root] = 2          # 2: in progress, 1: finished
+            while work:
+                v, i = work[-1]
+                if i < offsets[v + 1]:
+                    work[-1] = (v, i + 1)
+                    w = targets[i]
+                    if not done[w]:
+                        done[w] = 2
+                        work.append((w, offsets[w]))
+                    continue
+                work.pop()
+                done[v] = 1
+                for i in range(offsets[v], offsets[v + 1]):
+                    w = targets[i]
+                    if done[w] == 1 and w != v:
+                        lines[v] += lines[w]
+                        words[v] += words[w]
+        return lines, words
+
+    def reachable(self, start):
+        """Mark every node reachable from start through jumps, fall-throughs and calls (BFS)."""
+        seen = bytearray(len(self.ids))
+        seen[start] = 1
+        queue = [start]
+        for v in queue:
+            for offsets, targets in (self.flow, self.calls):
+                for i in range(offsets[v], offsets[v + 1]):
+                    w = targets[i]
+                    if not seen[w]:
+                        seen[w] = 1
+                        queue.append(w)
+        return seen
+
+    def components(self):
+        """Strongly connected components of the flow edges (iterative Tarjan).
+
+        Returns (component of each node, number of components). Components
+        are numbered in reverse topological order: edges only go from higher
+        to lower or equal numbers.
+        """
+        offsets, targets = self.flow
+        n = len(self.ids)
+        order = array('l', [-1]) * n
+        low = array('l', [0]) * n
+        on_stack = bytearray(n)
+        component = array('l', [-1]) * n
+        stack = []
+        counter = count = 0
+        for root in range(n):
+            if order[root] != -1:
+                continue
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [(root, offsets[root])]
+            while work:
+                v, i = work[-1]
+                if i < offsets[v + 1]:
+                    work[-1] = (v, i + 1)
+                    w = targets[i]
+                    if order[w] == -1:
+                        order[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = 1
+                        work.append((w, offsets[w]))
+                    elif on_stack[w] and order[w] < low[v]:
+                        low[v] = order[w]
+                    continue
+                work.pop()
+                if work and low[v] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[v]
+                if low[v] == order[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        component[w] = count
+                        if w == v:
+                            break
+                    count += 1
+        return component, count
+
+    def shortest_routes(self, start):
+        """BFS over flow edges: for each node the previous node and the dialogue on the fewest-label route."""
+        offsets, targets = self.flow
+        n = len(self.ids)
+        previous = array('l', [-1]) * n
+        lines = array('l', [-1]) * n
+        words = array('l', [-1]) * n
+        lines[start], words[start] = self.route_lines[start], self.route_words[start]
+        queue = [start]
+        for v in queue:
+            for i in range(offsets[v], offsets[v + 1]):
+                w = targets[i]
+                if lines[w] == -1:
+                    previous[w] = v
+                    lines[w] = lines[v] + self.route_lines[w]
+                    words[w] = words[v] + self.route_words[w]
+                    queue.append(w)
+        return previous, lines, words
+
+    def longest_routes(self, start, component, count):
+        """The route with the most words to every node, on the graph of components.
+
+        A loop (component) is counted once, so routes stay finite.
+        Returns (previous node, lines, words) per component.
+        """
+        offsets, targets = self.flow
+        members_offsets, members = _adjacency(count, [(component[v], v) for v in range(len(self.ids))])
+        lines = array('l', [0]) * count
+        words = array('l', [0]) * count
+        for v in range(len(self.ids)):
+            lines[component[v]] += self.route_lines[v]
+            words[component[v]] += self.route_words[v]
+
+        best_lines = array('l', [-1]) * count
+        best_words = array('l', [-1]) * count
+        previous = array('l', [-1]) * count
+        first = component[start]
+        best_lines[first], best_words[first] = lines[first], words[first]
+        for c in range(first, -1, -1):       # Topological order
+            if best_words[c] < 0:
+                continue
+            for m in range(members_offsets[c], members_offsets[c + 1]):
+                v = members[m]
+                for i in range(offsets[v], offsets[v + 1]):
+                    d = component[targets[i]]
+                    if d != c and best_words[c] + words[d] > best_words[d]:
+                        best_words[d] = best_words[c] + words[d]
+                        best_lines[d] = best_lines[c] + lines[d]
+                        previous[d] = v
+        return previous, best_lines, best_words
+
+
+def analyze(nodes, edges, records, start):
+    """Reachability and route statistics from the start label. Returns the report lines and route rows."""
+    graph = StoryGraph(nodes, edges, records)
+    ids = graph.ids
+    report = []
+    rows = []
+    if start not in nodes or nodes[start].kind != 'label':
+        report.append('Start label not found: ' + start)
+        return report, rows
+    s = ids.index(start)
+    n = len(ids)
+
+    seen = graph.reachable(s)
+    unreachable = [ids[v] for v in range(n) if not seen[v] and graph.kinds[v] == 'label']
+    missing = [ids[v] for v in range(n) if seen[v] and graph.kinds[v] == 'missing']
+    dynamic = [ids[v] for v in range(n) if seen[v] and graph.kinds[v] == 'dynamic']
+    offsets = graph.flow[0]
+    # Reachable labels that neither jump nor fall on, and are not called (a call returns):
+    endings = [v for v in range(n) if seen[v] and graph.kinds[v] == 'label'
+               and offsets[v] == offsets[v + 1] and not graph.called[v]]
+
+    component, count = graph.components()
+    sizes = array('l', [0]) * count
+    for v in range(n):
+        sizes[component[v]] += 1
+    loops = [[ids[v] for v in range(n) if component[v] == c] for c in range(count) if sizes[c] > 1]
+
+    short_previous, short_lines, short_words = graph.shortest_routes(s)
+    long_previous, long_lines, long_words = graph.longest_routes(s, component, count)
+
+    def route(previous, v, by_component=False):
+        path = [ids[v]]
+        while True:
+            v = previous[component[v]] if by_component else previous[v]
+            if v < 0:
+                return ' > '.join(reversed(path))
+            path.append(ids[v])
+
+    reached = [v for v in range(n) if seen[v] and graph.kinds[v] == 'label']
+    report.append('Labels: ' + str(sum(kind == 'label' for kind in graph.kinds)) + ', reachable from ' + start + ': ' + str(len(reached)))
+    report.append('Dialogue reachable: ' + str(sum(graph.lines[v] for v in reached)) + ' lines, '
+                  + str(sum(graph.words[v] for v in reached)) + ' words')
+    report.append('Unreachable labels (' + str(len(unreachable)) + '; labels only reached by jump/call expression are listed too):')
+    report.extend('  ' + node_id for node_id in unreachable)
+    report.append('Missing labels reached (' + str(len(missing)) + '):')
+    report.extend('  ' + node_id for node_id in missing)
+    report.append('Dynamic jumps/calls reached (' + str(len(dynamic)) + '):')
+    report.extend('  ' + node_id for node_id in dynamic)
+    report.append('Loops (' + str(len(loops)) + '):')
+    report.extend('  ' + ' <> '.join(loop) for loop in loops)
+    report.append('Endings / dead ends (' + str(len(endings)) + '):')
+    for v in endings:
+        if short_lines[v] < 0:      # Only reached through a call (e.g. a called label that jumps away)
+            report.append('  ' + ids[v] + ': reached through calls only')
+            continue
+        c = component[v]
+        report.append('  ' + ids[v] + ': shortest ' + str(short_lines[v]) + ' lines / ' + str(short_words[v])
+                      + ' words, longest ' + str(long_lines[c]) + ' lines / ' + str(long_words[c]) + ' words')
+        rows.append([ids[v], short_lines[v], short_words[v], long_lines[c], long_words[c],
+                     route(short_previous, v), route(long_previous, v, by_component=True)])
+    return report, rows
+
+
+def label_url(node_id):
+    return URL_SCHEME+':'+quote(node_id)
+
+
+def write_label_index(path, nodes, game_dir, editor):
+    """Write the label -> script:line index used by --open, in place of one .bat file per label."""
+    index = {'game_dir': game_dir, 'editor': editor,
+             'labels': {node.id: [node.path, node.line] for node in nodes.values() if node.path is not None}}
+    write_graph(path, [json.dumps(index, ensure_ascii=False, separators=(',', ':'))])
+
+
+def write_launcher(cwd):
+    """Write the launcher and its URL protocol registration, unless they are up to date."""
+    launcher = os.path.join(cwd, LAUNCHER_FILE)
+    files = {
+        launcher: '@cd /d "%~dp0"\r\n@python VNavigator.py --open %1\r\n',
+        os.path.join(cwd, PROTOCOL_FILE): (
+            'Windows Registry Editor Version 5.00\r\n\r\n'
+            '[HKEY_CURRENT_USER\\Software\\Classes\\'+URL_SCHEME+']\r\n'
+            '@="URL:VNavigator label"\r\n'
+            '"URL Protocol"=""\r\n\r\n'
+            '[HKEY_CURRENT_USER\\Software\\Classes\\'+URL_SCHEME+'\\shell\\open\\command]\r\n'
+            '@="\\"'+launcher.replace('\\', '\\\\')+'\\" \\"%1\\""\r\n'),
+    }
+    for path, text in files.items():
+        try:
+            with open(path, 'r', newline='') as f:
+                if f.read() == text:
+                    continue
+        except OSError:
+            pass
+        with open(path, 'w', newline='') as f:
+            f.write(text)
+
+
+def open_label(cwd, target):
+    """Open the script of a label (name or vnav: URL) in the editor, at the label's line."""
+    if target.lower().startswith(URL_SCHEME+':'):
+        target = unquote(target[len(URL_SCHEME)+1:]).strip('/')
+    with open(os.path.join(cwd, INDEX_FILE), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    entry = index['labels'].get(target.lower())
+    if entry is None:
+        print(target+' label not found in '+INDEX_FILE)
+        return 1
+    script = os.path.join(index['game_dir'], entry[0])
+    try:
+        subprocess.Popen([index['editor'], script+':'+str(entry[1])])
+    except OSError as e:
+        print('Cannot start editor '+index['editor']+': '+str(e))
+        return 1
+    return 0
+
+
+def write_graph(path, chunks):
+    """Write the pieces of a document straight to path (via a temporary file)."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create a yEd flowchart (.graphml) of a RenPy game's labels and jumps")
+    parser.add_argument('--workers', type=int, default=None, help='Processes used to parse scripts (default: CPU count)')
+    parser.add_argument('--verbose', action='store_true', help='Print every label and jump found')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false', help='Re-parse every script, ignoring '+CACHE_FILE)
+    parser.add_argument('--open', metavar='LABEL', help='Open the script of LABEL (or a vnav: URL) in Atom and exit')
+    parser.add_argument('--format', dest='formats', action='append', choices=OUTPUT_FORMATS,
+                        help='Output format, may be repeated (default: graphml)')
+    parser.add_argument('--analyze', action='store_true',
+                        help='Report unreachable labels, loops, endings and dialogue per route')
+    parser.add_argument('--start', default='start', help='First label for --analyze (default: start)')
+    args = parser.parse_args()
+    formats = args.formats or ['graphml']
+
+    # Get required directories/folders:
+    cwd = os.getcwd()               # Where VNavigator files are stored
+    if args.open:
+        return open_label(cwd, args.open)
+    path = Path(cwd)
+    pwd = path.parent.absolute()    # Where .rpy files are stored
+    folder = os.path.basename(cwd)  # Current folder name
+    atom = format(pwd)              # Plain-text path of Atom editor
+    atom = atom[:atom.find("renpy\\")+6]+'atom\\atom-windows\\atom.exe'
+
+    # Print all directories:
+    print("Working directory: {0}".format(cwd))
+    print("Parent directory:  {0}".format(pwd))
+    print('Folder name : '+folder)
+    print("Atom path: "+atom)
+
+    # Only scripts changed since the last run are read again:
+    cache_path = os.path.join(cwd, CACHE_FILE)
+    scripts = find_scripts(format(pwd))
+    cached = load_parse_cache(cache_path) if args.use_cache else {}
+    records, entries, reparsed = parse_files(format(pwd), scripts, args.workers, cached)
+    save_parse_cache(cache_path, entries)
+    print('Scripts parsed: '+str(reparsed)+' of '+str(len(scripts)))
+
+    nodes, edges = build_graph(records, args.verbose)
+
+    # One index for all labels (allows opening with Atom via vnav: URLs):
+    write_label_index(os.path.join(cwd, INDEX_FILE), nodes, format(pwd), atom)
+    write_launcher(cwd)
+
+    # Write the graph in every requested format:
+    for fmt in formats:
+        if fmt == 'graphml':
+            chunks = iter_graphml(nodes, edges)
+        elif fmt == 'json':
+            chunks = iter_json(nodes, edges)
+        else:
+            chunks = iter_dot(nodes, edges)
+        write_graph(os.path.join(cwd, folder+'.'+fmt), chunks)
+        print('Written: '+folder+'.'+fmt+' ('+str(len(nodes))+' nodes, '+str(len(edges))+' edges)')
+
+    # Reachability and route statistics (for QA and voice budgets):
+    if args.analyze:
+        report, rows = analyze(nodes, edges, records, args.start.lower())
+        write_graph(os.path.join(cwd, folder+'_analysis.txt'), [line+'\n' for line in report])
+        with open(os.path.join(cwd, folder+'_routes.csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Ending', 'Shortest lines', 'Shortest words', 'Longest lines', 'Longest words',
+                             'Shortest route', 'Longest route'])
+            writer.writerows(rows)
+        print('\n'.join(report[:2]))
+        print('Written: '+folder+'_analysis.txt, '+folder+'_routes.csv ('+str(len(rows))+' endings)')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
 
 # End of program
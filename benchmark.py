@@ -0,0 +1,537 @@
+"""Reproducible benchmarks of the tools on synthetic Ren'Py projects.
+
+A project is generated from a seed at a chosen scale: story scripts with
+labels, jumps, calls and menus, a dialogue.tab export of every line, a
+voice folder, tl folders and a multi-language translation catalog (with
+some identifiers damaged the way spreadsheets damage them). The same seed
+and scale always give the same project.
+
+Every case then runs one tool's work non-interactively, in a fresh child
+process, and records:
+
+- wall time (``seconds``, the best of ``--repeat`` runs),
+- peak resident memory of the case and its worker processes (``peak_rss_kib``),
+- files created, changed or removed in the project (``files_touched``).
+
+Results are appended to benchmark_history.json next to this script,
+together with the commit they were measured on, so runs can be compared
+across commits:
+
+    python benchmark.py --scale medium
+    python benchmark.py --scale medium --compare HEAD~3
+
+``--compare`` checks the run against the latest earlier run at the same
+scale (optionally only runs of a given commit) and exits with status 1
+if any case got slower or bigger by more than ``--threshold``.
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: peak memory comes from GetProcessMemoryInfo instead
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLS_DIR)
+
+from dialogue_export import DIALOGUE_COLUMNS, write_rows
+
+HISTORY_FILE = os.path.join(TOOLS_DIR, "benchmark_history.json")
+PROJECT_FILE = "bench_project.json"     # Scale and seed of a generated project
+OLD_MTIME_S = 3600                      # Generated files are dated back, out of the tools' racy windows
+TIME_FLOOR_S = 0.05                     # Timings below this are too noisy to flag as regressions
+
+SCALES = {
+    "small": {"files": 50, "labels": 500, "jumps": 1000, "rows": 5000, "voices": 5000, "languages": 2},
+    "medium": {"files": 400, "labels": 4000, "jumps": 8000, "rows": 40000, "voices": 40000, "languages": 3},
+    "large": {"files": 2000, "labels": 20000, "jumps": 40000, "rows": 200000, "voices": 200000, "languages": 4},
+}
+LANGUAGES = ("portuguese", "german", "french", "spanish", "italian", "russian")
+CHARACTERS = ("e", "m", "b", "j", "narrator")
+WORDS = {
+    "EN": ("the", "you", "what", "is", "this", "I", "know", "we", "should", "go", "home", "now", "it",
+           "was", "not", "my", "fault", "tonight", "really", "think", "about", "her", "him", "again"),
+    "PT": ("o", "voce", "que", "isso", "eu", "sei", "nos", "devemos", "ir", "para", "casa", "agora",
+           "nao", "foi", "minha", "culpa", "hoje", "realmente", "acho", "sobre", "ela", "ele", "de", "novo"),
+}
+
+
+# --- Synthetic projects -------------------------------------------------------
+
+def _sentence(rng, language):
+    words = WORDS[language]
+    text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 12)))
+    return text[0].upper() + text[1:] + rng.choice((".", "?", "!", "..."))
+
+
+def _damage(identifier, rng):
+    """Return ``identifier`` with one or two hash digits replaced by X, like a spreadsheet does."""
+    label, _, tail = identifier.rpartition("_")
+    chars = list(tail)
+    for i in rng.sample(range(len(chars)), rng.randint(1, 2)):
+        chars[i] = "X"
+    return label + "_" + "".join(chars)
+
+
+def generate_project(project_dir, scale, seed=0):
+    """Write a synthetic game below ``project_dir`` and return its description."""
+    rng = random.Random(seed)
+    game_dir = os.path.join(project_dir, "game")
+    files = [f"chapter{i % 10}/script_{i:05d}.rpy" for i in range(scale["files"])]
+    labels = ["start"] + [f"ch{i % 10}_scene_{i:05d}" for i in range(1, scale["labels"])]
+    label_file = {label: files[i % len(files)] for i, label in enumerate(labels)}
+
+    # Dialogue lines and jumps of every label
+    lines = {label: [] for label in labels}
+    used = set()
+    for _ in range(scale["rows"]):
+        label = rng.choice(labels)
+        while True:
+            identifier = f"{label}_{rng.getrandbits(32):08x}"
+            if identifier not in used:
+                break
+        used.add(identifier)
+        language = "PT" if rng.random() < 0.2 else "EN"
+        lines[label].append((identifier, rng.choice(CHARACTERS), _sentence(rng, language)))
+    jumps = {label: [] for label in labels}
+    for _ in range(scale["jumps"]):
+        source = rng.choice(labels)
+        # A few jumps go to labels that don't exist, like in a game being written
+        target = rng.choice(labels) if rng.random() > 0.01 else f"missing_{rng.randint(0, 99)}"
+        jumps[source].append((rng.choice(("jump", "jump", "call", "if", "menu")), target))
+
+    rows = []
+    by_file = {path: [] for path in files}
+    for label in labels:
+        by_file[label_file[label]].append(label)
+    for path in files:
+        out = []
+        line_number = 0
+        for label in by_file[path]:
+            out.append(f"label {label}:\n")
+            line_number += 1
+            for identifier, character, text in lines[label]:
+                say = f'"{text}"' if character == "narrator" else f'{character} "{text}"'
+                out.append(f"    {say}\n")
+                line_number += 1
+                rows.append([identifier, "" if character == "narrator" else character, text,
+                             f"game/{path}", str(line_number), say])
+            for kind, target in jumps[label]:
+                if kind == "if":
+                    out.append(f"    if flag_{rng.randint(0, 9)}:\n        jump {target}\n")
+                elif kind == "menu":
+                    out.append(f'    menu:\n        "{_sentence(rng, "EN")}":\n            jump {target}\n'
+                               f'        "{_sentence(rng, "EN")}":\n            pass\n')
+                else:
+                    out.append(f"    {kind} {target}\n")
+                line_number += out[-1].count("\n")
+            out.append("    return\n\n")
+            line_number += 2
+        if path == files[0]:
+            # VNavigator leaves "- "-titled labels and their jumps out of the graph
+            out.append("label hidden_notes: # - not in the graph\n    jump start\n")
+        os.makedirs(os.path.dirname(os.path.join(game_dir, path)), exist_ok=True)
+        with open(os.path.join(game_dir, path), "w", encoding="utf-8") as f:
+            f.writelines(out)
+    os.makedirs(os.path.join(game_dir, "vnav"), exist_ok=True)
+
+    dialogue_path = os.path.join(project_dir, "dialogue.tab")
+    write_rows(dialogue_path, DIALOGUE_COLUMNS, rows)
+
+    # Voice files: most lines have one, some don't, and a few files belong to no line
+    voice_dir = os.path.join(game_dir, "audio", "voice")
+    identifiers = [row[0] for row in rows]
+    voiced = [identifier for identifier in identifiers if rng.random() > 0.05][:scale["voices"]]
+    voiced += [f"unused_{i:06d}" for i in range(max(scale["voices"] - len(voiced), scale["voices"] // 50))]
+    for identifier in voiced:
+        folder = os.path.join(voice_dir, identifier.split("_", 1)[0])
+        os.makedirs(folder, exist_ok=True)
+        open(os.path.join(folder, identifier + ".ogg"), "wb").close()
+
+    # tl folders in the layout import_tansl.py reads, and a catalog of every language
+    languages = list(LANGUAGES[:scale["languages"]])
+    for language in languages:
+        for path in files:
+            tl_path = os.path.join(game_dir, "tl", language, path)
+            os.makedirs(os.path.dirname(tl_path), exist_ok=True)
+            with open(tl_path, "w", encoding="utf-8") as f:
+                for label in by_file[path]:
+                    for identifier, _character, text in lines[label]:
+                        f.write(f'# game/{path}\ntranslate {language} {identifier}\n    # "{text}"\n    ""\n\n')
+    catalog_path = os.path.join(project_dir, "catalog.csv")
+    catalog = []
+    for identifier in identifiers:
+        roll = rng.random()
+        if roll < 0.03:
+            continue
+        key = _damage(identifier, rng) if roll < 0.08 else identifier
+        catalog.append([key] + [f"[{language[:2]}] {identifier}" for language in languages])
+    with open(catalog_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Identifier"] + languages)
+        writer.writerows(catalog)
+
+    # Date everything back, so the tools' caches trust the files like they would in a real project
+    old = time.time() - OLD_MTIME_S
+    for root, _dirs, names in os.walk(project_dir):
+        for name in names + [""]:
+            os.utime(os.path.join(root, name), (old, old))
+
+    info = {"scale": scale, "seed": seed, "languages": languages}
+    with open(os.path.join(project_dir, PROJECT_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    return info
+
+
+# --- Cases ----------------------------------------------------------------------
+# Each case is (setup, run); both get the project and work folders. Setup runs
+# in its own process before the measured one, so it leaves no trace in the numbers.
+
+def _tool(folder, module):
+    sys.path.insert(0, os.path.join(TOOLS_DIR, folder) if folder else TOOLS_DIR)
+    return importlib.import_module(module)
+
+
+def _run_main(module, args, cwd=None):
+    saved_argv, saved_cwd = sys.argv, os.getcwd()
+    sys.argv = [module.__file__] + args
+    try:
+        if cwd:
+            os.chdir(cwd)
+        module.main()
+    finally:
+        sys.argv = saved_argv
+        os.chdir(saved_cwd)
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _store_setup(project, work):
+    for name in ("dialogue.tab", "catalog.csv"):
+        _remove(os.path.join(project, name + ".cols"))
+
+
+def _store_run(project, work):
+    store = _tool("", "dialogue_store")
+    for name in ("dialogue.tab", "catalog.csv"):
+        source = os.path.join(project, name)
+        for (identifier,) in store.iter_rows(source, ("Identifier",)):
+            store.open_store(source).find(identifier)
+
+
+def _missing_files(project, work, cache_path):
+    missing_files = _tool("Missing Files", "missing_files")
+    dialogue_path = os.path.join(project, "dialogue.tab")
+    voice_dir = os.path.join(project, "game", "audio", "voice")
+    tree = missing_files.build_audio_index(voice_dir, cache_path)
+    audio_files_map = missing_files.files_by_ext(voice_dir, tree, [".ogg"])[".ogg"]
+    spreadsheet_files = missing_files._load_identifiers(dialogue_path, "Identifier")
+    missing = spreadsheet_files - audio_files_map.keys()
+    extra = audio_files_map.keys() - spreadsheet_files
+    headers = missing_files.read_header(dialogue_path)
+    missing_files._write_if_changed(
+        os.path.join(work, "dialogue_missing.tab"),
+        missing_files._format_missing_tab(dialogue_path, headers, headers.index("Identifier"), missing),
+    )
+    missing_files._write_if_changed(
+        os.path.join(work, "extra_files.csv"), missing_files._format_extra_files_csv(extra, audio_files_map)
+    )
+
+
+def _missing_files_setup(project, work):
+    _remove(os.path.join(work, "audio_index_cache.json"))
+    _missing_files(project, work, os.path.join(work, "audio_index_cache.json"))
+
+
+def _vnavigator(project, *args):
+    _run_main(_tool("", "VNavigator"), list(args), cwd=os.path.join(project, "game", "vnav"))
+
+
+def _language_run(project, work):
+    language = _tool("Language Detection", "language")
+    if language.NgramDetector is None:
+        raise RuntimeError("skipped: the offline engine needs NumPy")
+    _run_main(language, [os.path.join(project, "dialogue.tab"), os.path.join(work, "dialogue_with_language.tab"),
+                         "--engine", "local", "--no-cache"])
+
+
+def _import_setup(project, work):
+    target = os.path.join(work, "import", "game", "tl")
+    _remove(target)
+    shutil.copytree(os.path.join(project, "game", "tl"), target)
+
+
+def _import_run(project, work, *args):
+    _run_main(_tool("Import_Transl", "import_tansl"),
+              ["--csv", os.path.join(project, "catalog.csv"), "--game", os.path.join(work, "import"), "--yes"] + list(args))
+
+
+CASES = {
+    "dialogue_store": (_store_setup, _store_run),
+    "missing_files": (None, lambda project, work: _missing_files(project, work, None)),
+    "missing_files_cached": (_missing_files_setup,
+                             lambda project, work: _missing_files(project, work, os.path.join(work, "audio_index_cache.json"))),
+    "vnavigator": (None, lambda project, work: _vnavigator(project, "--no-cache", "--analyze")),
+    "vnavigator_cached": (lambda project, work: _vnavigator(project, "--analyze"),
+                          lambda project, work: _vnavigator(project, "--analyze")),
+    "language": (None, _language_run),
+    "import_tansl": (_import_setup, _import_run),
+    "import_tansl_fuzzy": (_import_setup, lambda project, work: _import_run(project, work, "--fuzzy", "apply")),
+}
+
+
+# --- Measuring ------------------------------------------------------------------
+
+def peak_rss_kib():
+    """Peak resident memory of this process and its finished children, in KiB (None if unknown)."""
+    if resource is not None:
+        peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        return peak // 1024 if sys.platform == "darwin" else peak
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")
+            ]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        # Worker processes are not included on Windows
+        return counters.PeakWorkingSetSize // 1024
+    except (AttributeError, OSError):
+        return None
+
+
+def snapshot(root):
+    state = {}
+    for folder, _dirs, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            state[path] = (st.st_size, st.st_mtime_ns)
+    return state
+
+
+def run_case(name, phase, workdir, result_path):
+    """Body of the child process: run one phase of one case and write its measurements."""
+    project, work = os.path.join(workdir, "project"), os.path.join(workdir, "work")
+    os.makedirs(work, exist_ok=True)
+    setup, run = CASES[name]
+    if phase == "setup":
+        if setup is not None:
+            setup(project, work)
+        return
+
+    before = snapshot(workdir)
+    start = time.perf_counter()
+    run(project, work)
+    seconds = time.perf_counter() - start
+    after = snapshot(workdir)
+    touched = sum(1 for path, state in after.items() if before.get(path) != state) + len(before.keys() - after.keys())
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"seconds": round(seconds, 4), "peak_rss_kib": peak_rss_kib(), "files_touched": touched}, f)
+
+
+def measure(name, workdir, repeat):
+    """Run a case ``repeat`` times in fresh processes and keep the fastest run."""
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            result_path = os.path.join(tmp, "result.json")
+            for phase in ("setup", "run"):
+                process = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--case", name, "--phase", phase,
+                     "--workdir", workdir, "--result", result_path],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                )
+                if process.returncode:
+                    lines = process.stderr.strip().splitlines() or ["exit status " + str(process.returncode)]
+                    return {"error": f"{phase}: {lines[-1]}"}
+            with open(result_path, encoding="utf-8") as f:
+                result = json.load(f)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=TOOLS_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=TOOLS_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def resolve_commit(ref):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", ref], cwd=TOOLS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ref
+
+
+# --- History --------------------------------------------------------------------
+
+def _load_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_history(path, history):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def compare(run, history, ref=None, threshold=0.1):
+    """Print the change of every case against an earlier run; return the number of regressions."""
+    commit = resolve_commit(ref) if ref else None
+    earlier = [old for old in history
+               if old is not run and old["scale"] == run["scale"] and old["seed"] == run["seed"]
+               and (commit is None or (old["commit"] or "").startswith(commit))]
+    if not earlier:
+        print("\nNo earlier run at this scale" + (f" for {ref}" if ref else "") + " to compare with.")
+        return 0
+    base = earlier[-1]
+    print(f"\nCompared with {base['commit']} ({base['date']}):")
+    regressions = 0
+    for name, result in run["results"].items():
+        old = base["results"].get(name)
+        if not old or "error" in old or "error" in result:
+            continue
+        notes = []
+        for key, floor in (("seconds", TIME_FLOOR_S), ("peak_rss_kib", 0)):
+            if old.get(key) is None or result.get(key) is None or not old[key]:
+                continue
+            change = result[key] / old[key] - 1
+            flag = ""
+            if change > threshold and result[key] > floor:
+                flag = " REGRESSION"
+                regressions += 1
+            notes.append(f"{key} {change:+.0%}{flag}")
+        print(f"  {name:<22} " + ", ".join(notes))
+    return regressions
+
+
+def print_results(results):
+    print(f"{'case':<22} {'seconds':>9} {'peak MiB':>9} {'files':>7}")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<22} {result['error']}")
+            continue
+        rss = result["peak_rss_kib"]
+        print(f"{name:<22} {result['seconds']:>9.3f} {'?' if rss is None else format(rss / 1024, '.1f'):>9} "
+              f"{result['files_touched']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tools on a synthetic Ren'Py project")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="Project size preset (default: small)")
+    for key in SCALES["small"]:
+        parser.add_argument(f"--{key}", type=int, help=f"Override the number of {key} of the preset")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated project (default: 0)")
+    parser.add_argument("--cases", nargs="+", choices=CASES, help="Cases to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest is kept (default: 1)")
+    parser.add_argument("--workdir", help="Empty or new folder to keep the project in, reused while scale and seed match (default: a temporary folder)")
+    parser.add_argument("--history", default=HISTORY_FILE, help="JSON history file (default: %(default)s)")
+    parser.add_argument("--compare", nargs="?", const="", metavar="COMMIT",
+                        help="Compare with the latest earlier run (of COMMIT, if given)")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change flagged as a regression (default: 0.1)")
+    # Internal: one phase of one case, in a child process
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--phase", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        return run_case(args.case, args.phase, args.workdir, args.result)
+
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    if args.workdir and os.path.isdir(args.workdir) and os.listdir(args.workdir) \
+            and not os.path.exists(os.path.join(args.workdir, "project", PROJECT_FILE)):
+        print(f"{args.workdir} is not empty and holds no benchmark project; choose an empty or new folder.")
+        return 2
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="renpy_bench_")
+    try:
+        workdir = os.path.abspath(workdir)
+        project = os.path.join(workdir, "project")
+        info = _load_json(os.path.join(project, PROJECT_FILE), {})
+        if info.get("scale") != scale or info.get("seed") != args.seed:
+            # Only the benchmark's own folders are replaced
+            _remove(project)
+            _remove(os.path.join(workdir, "work"))
+            print(f"Generating project in {workdir} ...")
+            start = time.perf_counter()
+            generate_project(project, scale, args.seed)
+            print(f"Generated in {time.perf_counter() - start:.1f} s")
+
+        results = {}
+        for name in args.cases or CASES:
+            results[name] = measure(name, workdir, args.repeat)
+        print_results(results)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    history = _load_json(args.history, [])
+    run = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": scale,
+        "seed": args.seed,
+        "results": results,
+    }
+    history.append(run)
+    save_history(args.history, history)
+    print(f"\nSaved to {args.history}")
+
+    if args.compare is not None and compare(run, history, args.compare, args.threshold):
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Streaming reader/writer for Ren'Py dialogue exports (dialogue.tab).
+
+Ren'Py's "Extract Dialogue" export is tab-separated but frequently contains
+malformed quoting, which makes csv/pandas readers drop or misalign rows.
+The reader here splits on tabs only, repairs the common corruptions and
+yields rows lazily, so even million-line exports are processed with flat
+memory and without importing pandas.
+
+Comma-separated catalogs (``*.csv``, e.g. translated dialogue.csv files)
+are read with the csv module instead, since they are properly quoted.
+
+Usage from a tool folder (the tools are plain scripts, not a package):
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from dialogue_export import iter_rows, read_header
+"""
+
+import csv
+import io
+from typing import Iterable, Iterator, NamedTuple, Sequence, TextIO
+
+DIALOGUE_COLUMNS = ("Identifier", "Character", "Dialogue", "Filename", "Line Number", "Ren'Py Script")
+
+# Character values that are legitimately long words rather than narration.
+_KNOWN_CHARACTERS = {"centered"}
+
+
+class DialogueRow(NamedTuple):
+    identifier: str
+    character: str
+    dialogue: str
+    filename: str
+    line_number: int | None
+    renpy_script: str
+
+
+def _open_export(path: str) -> TextIO:
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+
+def _read_header_line(f: TextIO, path: str) -> list[str]:
+    header_line = f.readline()
+    if not header_line:
+        raise ValueError(f"Empty dialogue file: {path}")
+
+    headers = header_line.lstrip("\ufeff").rstrip("\n\r").split("\t")
+    if len(headers) < 3:
+        raise ValueError(f"Unexpected header in {path}: {headers}")
+    return headers
+
+
+def _is_dialogue_layout(headers: Sequence[str]) -> bool:
+    return len(headers) >= 6 and headers[1] == "Character" and headers[2] == "Dialogue"
+
+
+def _repair_row(parts: list[str], expected_cols: int, dialogue_layout: bool) -> list[str]:
+    """Bring a tab-split line back to the header's column layout.
+
+    The Dialogue/Character repairs only apply to Ren'Py's own export layout.
+    """
+
+    # If there are embedded tabs inside Dialogue, merge them back.
+    if len(parts) > expected_cols and dialogue_layout:
+        # Keep: Identifier, Character, (Dialogue...), Filename, Line Number, Ren'Py Script
+        parts = parts[:2] + ["\t".join(parts[2:-3])] + parts[-3:]
+
+    if len(parts) < expected_cols:
+        parts = parts + [""] * (expected_cols - len(parts))
+    elif len(parts) > expected_cols:
+        # As a fallback, merge all extras into the last column.
+        parts = parts[: expected_cols - 1] + ["\t".join(parts[expected_cols - 1 :])]
+
+    if not dialogue_layout:
+        return parts
+
+    # Repair common corruption: narration text ends up in Character.
+    # If Character isn't a short code and looks like a sentence, shift it into Dialogue.
+    character = parts[1]
+    dialogue = parts[2]
+    if character and (len(character) > 4 or " " in character) and character not in _KNOWN_CHARACTERS:
+        # Only do this when Dialogue looks like it was split off.
+        if dialogue and len(dialogue) < 10:
+            parts[2] = (character + " " + dialogue).strip()
+            parts[1] = ""
+
+    return parts
+
+
+def _column_indexes(headers: Sequence[str], columns: Iterable[str], path: str) -> list[int]:
+    indexes = []
+    for column in columns:
+        try:
+            indexes.append(headers.index(column))
+        except ValueError:
+            raise KeyError(
+                f"Column '{column}' not found in '{path}'. Columns found: {', '.join(headers)}"
+            ) from None
+    return indexes
+
+
+def _is_csv(path: str) -> bool:
+    return path.lower().endswith(".csv")
+
+
+def read_header(path: str) -> list[str]:
+    """Return the column names of a dialogue export."""
+
+    with _open_export(path) as f:
+        if _is_csv(path):
+            headers = next(csv.reader(f), None)
+            if not headers:
+                raise ValueError(f"Empty dialogue file: {path}")
+            headers[0] = headers[0].lstrip("\ufeff")
+            return headers
+        return _read_header_line(f, path)
+
+
+def _iter_csv_rows(path: str, columns: Sequence[str] | None) -> Iterator[list[str]]:
+    with _open_export(path) as f:
+        reader = csv.reader(f)
+        headers = next(reader, None)
+        if not headers:
+            raise ValueError(f"Empty dialogue file: {path}")
+        headers[0] = headers[0].lstrip("\ufeff")
+        expected_cols = len(headers)
+        indexes = _column_indexes(headers, columns, path) if columns is not None else None
+
+        for parts in reader:
+            if not parts:
+                continue
+            if len(parts) < expected_cols:
+                parts = parts + [""] * (expected_cols - len(parts))
+            if indexes is None:
+                yield parts[:expected_cols]
+            else:
+                yield [parts[i] for i in indexes]
+
+
+def iter_rows(path: str, columns: Sequence[str] | None = None) -> Iterator[list[str]]:
+    """Yield repaired rows of a dialogue export one at a time.
+
+    The export is tab-separated but may contain malformed quoting. This
+    parser never drops rows due to quoting issues and keeps the expected
+    6-column layout stable:
+      Identifier, Character, Dialogue, Filename, Line Number, Ren'Py Script
+
+    If ``columns`` is given, only those columns are yielded, in that order.
+    """
+
+    if _is_csv(path):
+        yield from _iter_csv_rows(path, columns)
+        return
+
+    with _open_export(path) as f:
+        headers = _read_header_line(f, path)
+        expected_cols = len(headers)
+        dialogue_layout = _is_dialogue_layout(headers)
+        indexes = _column_indexes(headers, columns, path) if columns is not None else None
+
+        for raw_line in f:
+            line = raw_line.rstrip("\n\r")
+            if not line:
+                continue
+            parts = _repair_row(line.split("\t"), expected_cols, dialogue_layout)
+            if indexes is None:
+                yield parts
+            else:
+                yield [parts[i] for i in indexes]
+
+
+def _parse_line_number(value: str) -> int | None:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def iter_dialogue(path: str) -> Iterator[DialogueRow]:
+    """Yield typed rows of a dialogue export.
+
+    Columns absent from the export's header come back as empty strings
+    (or ``None`` for the line number).
+    """
+
+    headers = read_header(path)
+    present = [column for column in DIALOGUE_COLUMNS if column in headers]
+    slots = [DIALOGUE_COLUMNS.index(column) for column in present]
+
+    for values in iter_rows(path, present):
+        fields = [""] * len(DIALOGUE_COLUMNS)
+        for slot, value in zip(slots, values):
+            fields[slot] = value
+        yield DialogueRow(
+            identifier=fields[0].strip(),
+            character=fields[1],
+            dialogue=fields[2],
+            filename=fields[3],
+            line_number=_parse_line_number(fields[4]),
+            renpy_script=fields[5],
+        )
+
+
+def _export_writer(f: TextIO):
+    # Quoting ensures any embedded tabs/newlines in fields won't corrupt column alignment.
+    return csv.writer(
+        f,
+        delimiter="\t",
+        quoting=csv.QUOTE_MINIMAL,
+        escapechar="\\",
+        lineterminator="\n",
+    )
+
+
+def write_rows(path: str, headers: Sequence[str], rows: Iterable[Sequence[str]]) -> int:
+    """Write rows as a tab-separated export and return the number of rows."""
+
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = _export_writer(f)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def format_rows(headers: Sequence[str], rows: Iterable[Sequence[str]]) -> str:
+    """Return rows formatted exactly as ``write_rows`` would write them."""
+
+    buffer = io.StringIO(newline="")
+    writer = _export_writer(buffer)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    return buffer.getvalue()
@@ -0,0 +1,436 @@
+"""Columnar, memory-mapped cache of Ren'Py dialogue exports.
+
+Parsing a large dialogue.tab (repairing its quoting, splitting every line)
+costs the tools more than the work they do with it. ``open_store`` converts
+an export once into a compact binary file next to it (``dialogue.tab.cols``)
+and memory-maps that file on later runs:
+
+- columns with few distinct values (Character, Filename, Language) are
+  stored once as a string table plus one uint32 code per row;
+- the other columns (Identifier, Dialogue, Ren'Py Script) are one UTF-8
+  blob plus an offset per row, decoded only when a cell is read;
+- the Identifier column gets an open-addressing hash index, so a single
+  identifier is found without scanning.
+
+The cache records the size, mtime and BLAKE2 hash of the export it was
+built from. A touched but unchanged export is re-hashed, not re-parsed;
+a changed one is converted again. When the cache can't be written (for
+example a read-only folder), the export is parsed in memory instead.
+
+``read_header`` and ``iter_rows`` have the same signatures and results as
+the ones in dialogue_export, so the tools only change their import:
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from dialogue_store import iter_rows, read_header
+
+Run ``python dialogue_store.py dialogue.tab [...]`` to convert exports ahead
+of time.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Iterable, Iterator, Sequence
+
+from dialogue_export import iter_rows as _parse_rows
+from dialogue_export import read_header as _parse_header
+
+STORE_VERSION = 2
+STORE_SUFFIX = ".cols"
+IDENTIFIER_COLUMN = "Identifier"
+
+_MAGIC = b"DLGCOLS\0"
+_ALIGN = 8
+_HASH_CHUNK = 1 << 20
+_EMPTY_SLOT = 0xFFFFFFFF
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _key_hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def _source_info(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class _Section:
+    """Accumulates the binary sections of a store file, 8-byte aligned."""
+
+    def __init__(self):
+        self.parts: list[bytes] = []
+        self.offset = 0
+
+    def add(self, data: bytes) -> tuple[int, int]:
+        start = self.offset
+        self.parts.append(data)
+        self.offset += len(data)
+        padding = -self.offset % _ALIGN
+        if padding:
+            self.parts.append(b"\0" * padding)
+            self.offset += padding
+        return start, len(data)
+
+
+def _build_hash_index(keys: list[bytes]) -> array:
+    size = 1
+    while size < 2 * len(keys):
+        size *= 2
+    slots = array("I", [_EMPTY_SLOT]) * size
+    mask = size - 1
+    for row, key in enumerate(keys):
+        if not key:
+            continue
+        slot = _key_hash(key) & mask
+        while slots[slot] != _EMPTY_SLOT:
+            slot = (slot + 1) & mask
+        slots[slot] = row
+    return slots
+
+
+def write_store(source: str, store_path: str) -> int:
+    """Convert the export ``source`` into a store file and return its row count.
+
+    Raises OSError if ``source`` changes while it is read, rather than
+    recording the new file's size, mtime and hash next to the old rows.
+    """
+
+    info = _source_info(source)
+    digest = file_digest(source)
+    headers = _parse_header(source)
+    columns: list[list[str]] = [[] for _ in headers]
+    for row in _parse_rows(source):
+        for values, value in zip(columns, row):
+            values.append(value)
+    rows = len(columns[0]) if columns else 0
+    if _source_info(source) != info or file_digest(source) != digest:
+        raise OSError(f"{source} changed while it was converted")
+
+    sections = _Section()
+    layout = []
+    for name, values in zip(headers, columns):
+        distinct = dict.fromkeys(values)
+        # Identifier always gets the offsets layout, which is the one that carries the index
+        if name != IDENTIFIER_COLUMN and len(distinct) * 2 <= rows:
+            table = list(distinct)
+            code = {value: i for i, value in enumerate(table)}
+            blob = "".join(table).encode("utf-8")
+            offsets = array("Q", [0])
+            for value in table:
+                offsets.append(offsets[-1] + len(value.encode("utf-8")))
+            layout.append({
+                "name": name,
+                "kind": "interned",
+                "blob": sections.add(blob),
+                "offsets": sections.add(offsets.tobytes()),
+                "codes": sections.add(array("I", (code[value] for value in values)).tobytes()),
+            })
+        else:
+            encoded = [value.encode("utf-8") for value in values]
+            offsets = array("Q", [0])
+            for value in encoded:
+                offsets.append(offsets[-1] + len(value))
+            column = {
+                "name": name,
+                "kind": "offsets",
+                "blob": sections.add(b"".join(encoded)),
+                "offsets": sections.add(offsets.tobytes()),
+            }
+            if name == IDENTIFIER_COLUMN:
+                keys = [value.strip().encode("utf-8") for value in values]
+                column["index"] = sections.add(_build_hash_index(keys).tobytes())
+            layout.append(column)
+
+    header = json.dumps({
+        "version": STORE_VERSION,
+        "byteorder": sys.byteorder,
+        "rows": rows,
+        "columns": layout,
+        "source": dict(info, blake2b=digest),
+    }).encode("utf-8")
+    data_start = len(_MAGIC) + 8 + len(header)
+    data_start += -data_start % _ALIGN
+
+    tmp_path = store_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(b"\0" * (data_start - f.tell()))
+        for part in sections.parts:
+            f.write(part)
+    os.replace(tmp_path, store_path)
+    return rows
+
+
+class Column:
+    """Read-only sequence view of one column of a store."""
+
+    __slots__ = ("_store", "_blob", "_offsets", "_codes", "_table")
+
+    def __init__(self, store: "DialogueStore", spec: dict):
+        self._store = store
+        self._blob = store._view(spec["blob"], "B")
+        self._offsets = store._view(spec["offsets"], "Q")
+        self._codes = store._view(spec["codes"], "I") if spec["kind"] == "interned" else None
+        self._table = None
+        if self._codes is not None:
+            self._table = [self._decode(i) for i in range(len(self._offsets) - 1)]
+
+    def release(self) -> None:
+        """Release the views into the store's map; the column can't be read afterwards."""
+        for view in (self._blob, self._offsets, self._codes):
+            if view is not None:
+                view.release()
+
+    def _decode(self, i: int) -> str:
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __len__(self) -> int:
+        return self._store.rows
+
+    def __getitem__(self, row: int) -> str:
+        if self._codes is not None:
+            return self._table[self._codes[row]]
+        return self._decode(row)
+
+    def __iter__(self) -> Iterator[str]:
+        if self._codes is not None:
+            table = self._table
+            return (table[code] for code in self._codes)
+        return (self._decode(row) for row in range(self._store.rows))
+
+
+class DialogueStore:
+    """A memory-mapped store file. Use :func:`open_store` to get one."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(_MAGIC)] != _MAGIC:
+            self._mmap.close()
+            raise ValueError(f"Not a dialogue store: {path}")
+        header_size = int.from_bytes(self._mmap[len(_MAGIC):len(_MAGIC) + 8], "little")
+        header_start = len(_MAGIC) + 8
+        self.meta = json.loads(self._mmap[header_start:header_start + header_size])
+        data_start = header_start + header_size
+        self._data_start = data_start + -data_start % _ALIGN
+        self._buffer = memoryview(self._mmap)
+        self.rows: int = self.meta["rows"]
+        self.headers: list[str] = [spec["name"] for spec in self.meta["columns"]]
+        self._columns: dict[str, Column] = {}
+        self._index = None
+
+    def _view(self, section: Sequence[int], fmt: str) -> memoryview:
+        start, length = section
+        start += self._data_start
+        return self._buffer[start:start + length].cast(fmt)
+
+    def is_current(self, source: str) -> bool:
+        """True if the store was built from the current content of ``source``."""
+        meta = self.meta
+        if meta.get("version") != STORE_VERSION or meta.get("byteorder") != sys.byteorder:
+            return False
+        recorded = meta["source"]
+        info = _source_info(source)
+        if info["size"] != recorded["size"]:
+            return False
+        if info["mtime_ns"] == recorded["mtime_ns"]:
+            return True
+        if file_digest(source) != recorded["blake2b"]:
+            return False
+        # Touched but unchanged: don't hash it again while this store is open.
+        recorded["mtime_ns"] = info["mtime_ns"]
+        return True
+
+    def column(self, name: str) -> Column:
+        if name not in self._columns:
+            for spec in self.meta["columns"]:
+                if spec["name"] == name:
+                    self._columns[name] = Column(self, spec)
+                    break
+            else:
+                raise KeyError(
+                    f"Column '{name}' not found in '{self.path[:-len(STORE_SUFFIX)]}'. "
+                    f"Columns found: {', '.join(self.headers)}"
+                )
+        return self._columns[name]
+
+    def iter_rows(self, columns: Sequence[str] | None = None) -> Iterator[list[str]]:
+        """Yield rows exactly like ``dialogue_export.iter_rows`` does for the source export."""
+        views = [self.column(name) for name in (self.headers if columns is None else columns)]
+        return (list(values) for values in zip(*views)) if views else iter(())
+
+    def find(self, identifier: str) -> int:
+        """Return the first row whose stripped Identifier is ``identifier``, or -1."""
+        for row in self.find_all(identifier):
+            return row
+        return -1
+
+    def find_all(self, identifier: str) -> Iterator[int]:
+        """Yield every row whose stripped Identifier is ``identifier``, in file order."""
+        if self._index is None:
+            for spec in self.meta["columns"]:
+                if spec["name"] == IDENTIFIER_COLUMN and "index" in spec:
+                    self._index = self._view(spec["index"], "I")
+                    break
+            else:
+                raise KeyError(f"'{self.path}' has no {IDENTIFIER_COLUMN} index")
+        key = identifier.encode("utf-8")
+        slots = self._index
+        mask = len(slots) - 1
+        column = self.column(IDENTIFIER_COLUMN)
+        slot = _key_hash(key) & mask
+        # Linear probing inserts rows in file order, so matches come out in file order.
+        while (row := slots[slot]) != _EMPTY_SLOT:
+            if column[row].strip() == identifier:
+                yield row
+            slot = (slot + 1) & mask
+
+    def close(self) -> None:
+        for column in self._columns.values():
+            column.release()
+        self._columns.clear()
+        if self._index is not None:
+            self._index.release()
+            self._index = None
+        self._buffer.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views a caller still holds point into the map; it's unmapped once they're gone.
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _ParsedExport:
+    """In-memory stand-in used when a store file can't be written."""
+
+    def __init__(self, source: str):
+        self.path = source
+        self._info = _source_info(source)
+        self.headers = _parse_header(source)
+        self._rows = list(_parse_rows(source))
+        self.rows = len(self._rows)
+
+    def iter_rows(self, columns: Sequence[str] | None = None) -> Iterator[list[str]]:
+        if columns is None:
+            return (list(row) for row in self._rows)
+        indexes = []
+        for name in columns:
+            if name not in self.headers:
+                raise KeyError(
+                    f"Column '{name}' not found in '{self.path}'. Columns found: {', '.join(self.headers)}"
+                )
+            indexes.append(self.headers.index(name))
+        return ([row[i] for i in indexes] for row in self._rows)
+
+    def is_current(self, source: str) -> bool:
+        return _source_info(source) == self._info
+
+    def find(self, identifier: str) -> int:
+        for row in self.find_all(identifier):
+            return row
+        return -1
+
+    def find_all(self, identifier: str) -> Iterator[int]:
+        for row, (value,) in enumerate(self.iter_rows((IDENTIFIER_COLUMN,))):
+            if value.strip() == identifier:
+                yield row
+
+    def close(self) -> None:
+        self._rows = []
+
+
+_open_stores: dict[str, DialogueStore | _ParsedExport] = {}
+
+
+def store_path_for(source: str) -> str:
+    return source + STORE_SUFFIX
+
+
+def open_store(source: str) -> DialogueStore | _ParsedExport:
+    """Return the store of the export ``source``, converting it first if it changed.
+
+    Stores are kept open for the life of the process; asking again for the
+    same export only re-checks its size and mtime.
+    """
+
+    source = os.path.abspath(source)
+    store = _open_stores.get(source)
+    if store is not None:
+        if store.is_current(source):
+            return store
+        _open_stores.pop(source)
+        store.close()
+
+    path = store_path_for(source)
+    store = None
+    if os.path.exists(path):
+        try:
+            store = DialogueStore(path)
+        except (OSError, ValueError):
+            store = None
+        if store is not None and not store.is_current(source):
+            store.close()
+            store = None
+    if store is None:
+        try:
+            write_store(source, path)
+            store = DialogueStore(path)
+        except OSError:
+            store = _ParsedExport(source)
+    _open_stores[source] = store
+    return store
+
+
+def read_header(path: str) -> list[str]:
+    """Return the column names of a dialogue export."""
+    return list(open_store(path).headers)
+
+
+def iter_rows(path: str, columns: Sequence[str] | None = None) -> Iterator[list[str]]:
+    """Yield the rows of a dialogue export from its store.
+
+    Same rows, in the same order, as ``dialogue_export.iter_rows``.
+    """
+    return open_store(path).iter_rows(columns)
+
+
+def convert(sources: Iterable[str]) -> None:
+    for source in sources:
+        store = open_store(source)
+        if isinstance(store, DialogueStore):
+            size = os.path.getsize(store.path)
+            print(f"{source}: {store.rows} rows -> {store.path} ({size / 1024:.0f} KiB)")
+        else:
+            print(f"{source}: {store.rows} rows (could not write {store_path_for(source)})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert dialogue exports into memory-mapped column stores")
+    parser.add_argument("exports", nargs="+", help="dialogue.tab / dialogue.csv files")
+    args = parser.parse_args()
+    convert(args.exports)
+
+
+if __name__ == "__main__":
+    main()